@@ -0,0 +1,66 @@
+from AlgorithmImports import *
+from typing import Dict
+import time
+import numpy as np
+
+from footprint_utils import (
+    _build_path_points_np,
+    _build_paths_tpl,
+    _compute_micro_count,
+    _micro_allocate_paths,
+    micro_allocate_volume_raw,
+)
+
+
+def benchmark_path_templates(n_seconds: int = 20000, tick_size: float = 0.25, seed: int = 0) -> Dict[str, float]:
+    """Per-second cost of micro_allocate_volume_raw against the original implementation
+    (three _build_path_points_np calls, np.add.at bucketing).
+
+    Uses random seconds whose volumes cover the whole 9..90 range of n and checks both variants give
+    identical results. Returns microseconds per second for the whole call and for path construction
+    alone, with the corresponding speedups.
+    """
+    rng = np.random.default_rng(seed)
+    base = 100.0 + tick_size * rng.integers(-8, 9, size=(n_seconds, 4))
+    quotes = base[:, None, :] + tick_size * np.array([[0, 0, 0, 0], [-1, -1, -1, -1], [1, 1, 1, 1]])
+    volumes = rng.integers(1, 120, size=n_seconds).astype(float)
+    rows = [(quotes[j].tolist(), float(volumes[j])) for j in range(n_seconds)]
+
+    def _legacy(q, v):
+        n = _compute_micro_count(v)
+        price_path = _build_path_points_np(*q[0], n)
+        bid_path = _build_path_points_np(*q[1], n)
+        ask_path = _build_path_points_np(*q[2], n)
+        return _micro_allocate_paths(price_path, bid_path, ask_path, v, n, tick_size)
+
+    def _template(q, v):
+        return micro_allocate_volume_raw(*q[0], v, *q[1], *q[2], tick_size=tick_size)
+
+    timings: Dict[str, float] = {}
+    results = {}
+    for name, fn in (("legacy_us", _legacy), ("template_us", _template)):
+        t0 = time.perf_counter()
+        results[name] = [fn(q, v) for q, v in rows]
+        timings[name] = (time.perf_counter() - t0) * 1e6 / n_seconds
+    if results["legacy_us"] != results["template_us"]:
+        raise AssertionError("template paths diverge from _build_path_points_np")
+    timings["speedup"] = timings["legacy_us"] / timings["template_us"]
+
+    # path construction alone (the part the templates replace)
+    counts = [_compute_micro_count(v) for _, v in rows]
+    t0 = time.perf_counter()
+    for (q, _), n in zip(rows, counts):
+        _build_path_points_np(*q[0], n); _build_path_points_np(*q[1], n); _build_path_points_np(*q[2], n)
+    timings["paths_legacy_us"] = (time.perf_counter() - t0) * 1e6 / n_seconds
+    knots = [np.array(q, dtype=float) for q, _ in rows]
+    t0 = time.perf_counter()
+    for k, n in zip(knots, counts):
+        _build_paths_tpl(n, k)
+    timings["paths_template_us"] = (time.perf_counter() - t0) * 1e6 / n_seconds
+    timings["paths_speedup"] = timings["paths_legacy_us"] / timings["paths_template_us"]
+    return timings
+
+
+if __name__ == "__main__":
+    for key, value in benchmark_path_templates().items():
+        print(f"{key}: {value:.3f}")
@@ -7,46 +7,85 @@ import numpy as np
 import pandas as pd
 
 from footprint_field_mapping import HISTORY_DF_FIELD_MAP
-from footprint_utils import micro_allocate_volume_raw
+from footprint_utils import allocate_day, TickLadderAccumulator
+from footprint_batch import FootprintBatch, FOOTPRINT_COLUMNS
 
 
 def _round_series_preserve_total(values: np.ndarray, target_total: int) -> np.ndarray:
     """
-    Round an array of non-negative floats to integers while preserving the sum to target_total.
-    Strategy: round to nearest, then distribute the residual by largest fractional parts.
+    Round an array of non-negative floats to non-negative integers summing exactly to target_total.
+    Strategy (largest remainder, loop-free): scale to quotas summing to target_total, floor them,
+    then give the remaining units to the largest fractional parts (ties -> lower index).
+    Sums are taken sequentially so _round_segments_preserve_total reproduces it bit for bit.
     """
     if values.size == 0:
         return values.astype(np.int64)
-    rounded = np.rint(values).astype(np.int64)
-    diff = int(target_total) - int(rounded.sum())
-    if diff == 0:
-        return rounded
-    # Compute fractional parts (positive allocation if we need to add, negative if we need to subtract)
-    frac = values - np.floor(values)
-    if diff < 0:
-        # need to subtract |diff| from elements with smallest fractional parts first (they were rounded up least justified)
-        order = np.argsort(frac)  # ascending
-        for idx in order:
-            if diff == 0:
-                break
-            if rounded[idx] > 0:
-                rounded[idx] -= 1
-                diff += 1
+    target = max(int(target_total), 0)
+    v = np.clip(np.asarray(values, dtype=float), 0.0, None)
+    total = float(np.cumsum(v)[-1])
+    if total > 0:
+        quota = v * (target / total)
     else:
-        # need to add diff to elements with largest fractional parts first
-        order = np.argsort(-frac)  # descending
-        for idx in order:
-            if diff == 0:
-                break
-            rounded[idx] += 1
-            diff -= 1
-    return rounded
+        quota = np.full(v.size, target / v.size)
+    base = np.floor(quota).astype(np.int64)
+    # 0 <= remaining <= size: each floor drops < 1, quotas sum to target up to float error
+    remaining = target - int(base.sum())
+    frac = quota - base
+    if remaining > 0:
+        base[np.argsort(-frac, kind="stable")[:remaining]] += 1
+    elif remaining < 0:
+        # only reachable through float error in quota; take back from the smallest remainders
+        order = np.argsort(np.where(base > 0, frac, np.inf), kind="stable")[:-remaining]
+        base[order] -= 1
+    return base
+
+
+def _round_segments_preserve_total(values: np.ndarray, offsets: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Segmented _round_series_preserve_total: segment k is values[offsets[k]:offsets[k+1]] with target targets[k].
+    One lexsort ranks the fractional parts inside every segment (a second one ranks the take-back order of
+    segments that overshoot); results equal the per-segment calls.
+    """
+    n_seg = targets.size
+    widths = np.diff(offsets).astype(np.int64)
+    out = np.zeros(values.size, dtype=np.int64)
+    if values.size == 0:
+        return out
+    seg = np.repeat(np.arange(n_seg, dtype=np.int64), widths)
+    target = np.maximum(np.asarray(targets, dtype=np.int64), 0)
+    v = np.clip(np.asarray(values, dtype=float), 0.0, None)
+    total = np.bincount(seg, weights=v, minlength=n_seg)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = target / total
+        even = target / widths
+        quota = np.where(total[seg] > 0, v * scale[seg], even[seg])
+    base = np.floor(quota).astype(np.int64)
+    remaining = target - np.bincount(seg, weights=base, minlength=n_seg).astype(np.int64)
+    frac = quota - base
+    idx = np.arange(values.size, dtype=np.int64)
+    order = np.lexsort((idx, -frac, seg))
+    rank = np.empty(values.size, dtype=np.int64)
+    rank[order] = idx - np.repeat(offsets[:-1].astype(np.int64), widths)
+    out = base + (rank < remaining[seg])
+    # float error in the quotas can overshoot; take back from the smallest remainders of positive levels
+    if (remaining < 0).any():
+        order = np.lexsort((idx, np.where(base > 0, frac, np.inf), seg))
+        rank[order] = idx - np.repeat(offsets[:-1].astype(np.int64), widths)
+        out -= rank < -remaining[seg]
+    return out
 
 
 def _to_tick_int(price: float, tick_size: float) -> int:
     return int(round(price / tick_size)) if tick_size and tick_size > 0 else int(round(price))
 
 
+def _to_tick_int_array(prices: np.ndarray, tick_size: float) -> np.ndarray:
+    """Vectorized _to_tick_int (np.rint rounds half to even, like round())."""
+    if tick_size and tick_size > 0:
+        return np.rint(prices / tick_size).astype(np.int64)
+    return np.rint(prices).astype(np.int64)
+
+
 def _finalize_bar(
     start_time: datetime,
     end_time: datetime,
@@ -57,63 +96,31 @@ def _finalize_bar(
     total_volume_sum: float,
     buy_volume_sum: float,
     sell_volume_sum: float,
-    price_bucket_to_buy_sell: Dict[int, Tuple[float, float]],
+    ticks_sorted: np.ndarray,
+    buy_vals: np.ndarray,
+    sell_vals: np.ndarray,
     tick_size: float,
 ) -> Dict[str, object]:
-    """Convert accumulators into one V-bar record with integer ticks and integer volumes."""
+    """Convert accumulators into one V-bar record with integer ticks and integer volumes.
+    The ladder is given as tick-sorted arrays (int64 ticks, float volumes) and returned as int32 arrays."""
     # OHLC ticks (integers)
     open_i = _to_tick_int(trade_open, tick_size)
     high_i = _to_tick_int(trade_high, tick_size)
     low_i = _to_tick_int(trade_low, tick_size)
     close_i = _to_tick_int(trade_close, tick_size)
 
-    # Convert per-price float volumes to arrays ordered by price tick
-    if price_bucket_to_buy_sell:
-        ticks_sorted = np.array(sorted(price_bucket_to_buy_sell.keys()), dtype=np.int64)
-        buy_vals = np.array([price_bucket_to_buy_sell[k][0] for k in ticks_sorted], dtype=float)
-        sell_vals = np.array([price_bucket_to_buy_sell[k][1] for k in ticks_sorted], dtype=float)
-    else:
-        ticks_sorted = np.array([], dtype=np.int64)
-        buy_vals = np.array([], dtype=float)
-        sell_vals = np.array([], dtype=float)
-
-    # Integerize totals
-    total_volume_int = int(round(total_volume_sum))
-    buy_volume_int = int(round(buy_volume_sum))
-    sell_volume_int = int(round(sell_volume_sum))
-
-    # Ensure non-negative
-    if total_volume_int < 0:
-        total_volume_int = 0
-    if buy_volume_int < 0:
-        buy_volume_int = 0
-    if sell_volume_int < 0:
-        sell_volume_int = 0
-
-    # Integerize per-level volumes while preserving bar-level totals as much as possible
+    # Integerize totals: split the rounded total between sides so buy + sell == total exactly
+    total_volume_int = max(int(round(total_volume_sum)), 0)
+
+    # Integerize per-level volumes; each side sums exactly to its share, no level goes negative
     if ticks_sorted.size > 0:
-        buy_int = _round_series_preserve_total(buy_vals, buy_volume_int)
-        sell_int = _round_series_preserve_total(sell_vals, sell_volume_int)
-        # Clamp negatives due to rounding artifacts (rare)
-        buy_int = np.maximum(buy_int, 0)
-        sell_int = np.maximum(sell_int, 0)
+        side_int = _round_series_preserve_total(np.array([buy_volume_sum, sell_volume_sum], dtype=float), total_volume_int)
+        buy_int = _round_series_preserve_total(buy_vals, int(side_int[0]))
+        sell_int = _round_series_preserve_total(sell_vals, int(side_int[1]))
     else:
         buy_int = np.array([], dtype=np.int64)
         sell_int = np.array([], dtype=np.int64)
 
-    # Optionally ensure buy_int.sum() + sell_int.sum() == total_volume_int
-    # If mismatch remains due to model rounding, adjust sell side first then buy side
-    mismatch = total_volume_int - int(buy_int.sum() + sell_int.sum())
-    if mismatch != 0 and ticks_sorted.size > 0:
-        # distribute on the side with greater remaining fractional slack; here we split half-half
-        target = sell_int if sell_int.sum() >= buy_int.sum() else buy_int
-        step = 1 if mismatch > 0 else -1
-        for i in range(abs(mismatch)):
-            j = i % target.size
-            if step < 0 and target[j] == 0:
-                continue
-            target[j] += step
-
     trade_date = (start_time.year * 10000 + start_time.month * 100 + start_time.day)
 
     return {
@@ -127,75 +134,35 @@ def _finalize_bar(
         "total_volume": np.int64(total_volume_int),
         "buy_volume": np.int64(int(buy_int.sum())),
         "sell_volume": np.int64(int(sell_int.sum())),
-        "prices_i": ticks_sorted.astype(np.int32).tolist(),
-        "vol_buy": buy_int.astype(np.int32).tolist(),
-        "vol_sell": sell_int.astype(np.int32).tolist(),
+        "prices_i": ticks_sorted.astype(np.int32),
+        "vol_buy": buy_int.astype(np.int32),
+        "vol_sell": sell_int.astype(np.int32),
     }
 
 
-def build_v_footprints(
-    df_second: pd.DataFrame,
-    v_unit: int,
-    tick_size: float,
-) -> pd.DataFrame:
-    """
-    将当日秒级 RAW 数据聚合为按成交量单位 V 的 footprint V-bar 列表。
-    约束：
-      - 末尾不足 V 的尾巴保留为一根 bar
-      - 使用整数 tick（round(price / tick_size)）
-      - 成交量使用整数；买卖拆分与价格阶梯使用现有 micro_allocate_volume_raw
-      - 时间戳保持为原始（交易所）时区的 naive datetime，不做调整
-    输入 df_second 要求包含 HISTORY_DF_FIELD_MAP 对应的字段，并索引或列含时间列 'time'
-    返回列：
-      trade_date(int32 YYYYMMDD), start_time, end_time,
-      open_i, high_i, low_i, close_i (all int32 ticks),
-      total_volume(int64), buy_volume(int64), sell_volume(int64),
-      prices_i(list<int32>), vol_buy(list<int32>), vol_sell(list<int32>)
-    """
-    if df_second is None or df_second.empty:
-        return pd.DataFrame(columns=[
-            "trade_date", "start_time", "end_time",
-            "open_i", "high_i", "low_i", "close_i",
-            "total_volume", "buy_volume", "sell_volume",
-            "prices_i", "vol_buy", "vol_sell",
-        ])
-
-    # Normalize time index (避免不必要的 copy)
-    if "time" in df_second.columns:
-        df_second["time"] = pd.to_datetime(df_second["time"])
-        df = df_second.set_index("time")
-    else:
-        # assume DatetimeIndex
-        df = df_second
-        if not isinstance(df.index, pd.DatetimeIndex):
-            raise ValueError("df_second must have a DatetimeIndex or a 'time' column")
-    df = df.sort_index()
+def _finalize_ladder_bar(ladder: TickLadderAccumulator, **kwargs) -> Dict[str, object]:
+    ticks_sorted, buy_vals, sell_vals = ladder.finalize()
+    return _finalize_bar(ticks_sorted=ticks_sorted, buy_vals=buy_vals, sell_vals=sell_vals, **kwargs)
 
-    # Rename to internal names
-    df = df.rename(columns=HISTORY_DF_FIELD_MAP)
-    required_cols = list(HISTORY_DF_FIELD_MAP.values())
-    if not all(col in df.columns for col in required_cols):
-        # Strict: if any leg missing, return empty
-        return pd.DataFrame(columns=[
-            "trade_date", "start_time", "end_time",
-            "open_i", "high_i", "low_i", "close_i",
-            "total_volume", "buy_volume", "sell_volume",
-            "prices_i", "vol_buy", "vol_sell",
-        ])
-    df = df[required_cols].dropna()
-    if 'trade_volume' in df.columns:
-        df = df[df['trade_volume'] > 0]
-        
-    if df.empty:
-        return pd.DataFrame(columns=[
-            "trade_date", "start_time", "end_time",
-            "open_i", "high_i", "low_i", "close_i",
-            "total_volume", "buy_volume", "sell_volume",
-            "prices_i", "vol_buy", "vol_sell",
-        ])
 
-    v_threshold = int(v_unit)
+def _cut_bars_loop(
+    times: pd.DatetimeIndex,
+    cols: Dict[str, np.ndarray],
+    alloc: Tuple[np.ndarray, ...],
+    v_threshold: int,
+    tick_size: float,
+) -> FootprintBatch:
+    """逐秒累加切分 V-bar（参考实现）：累计量 >= V 即切分，末尾不足 V 的尾巴保留。"""
+    buy_tot, sell_tot, sec_idx, ticks, buy_c, sell_c = alloc
     bars: List[Dict[str, object]] = []
+    n_rows = len(times)
+    # contributions are sorted by second; bounds[i]:bounds[i+1] belong to second i
+    bounds = np.searchsorted(sec_idx, np.arange(n_rows + 1)).tolist()
+    buy_tot_l = buy_tot.tolist()
+    sell_tot_l = sell_tot.tolist()
+    t_o_l = cols["trade_open"].tolist(); t_h_l = cols["trade_high"].tolist()
+    t_l_l = cols["trade_low"].tolist();  t_c_l = cols["trade_close"].tolist()
+    vol_l = cols["trade_volume"].tolist()
 
     # Accumulators for current V-bar
     curr_start: datetime = None
@@ -207,21 +174,15 @@ def build_v_footprints(
     total_volume_sum = 0.0
     buy_volume_sum = 0.0
     sell_volume_sum = 0.0
-    # bucket: tick_int -> (buy_sum, sell_sum)
-    bucket_map: Dict[int, List[float]] = {}
+    # dense per-tick (buy_sum, sell_sum), indexed by tick - base_tick
+    ladder = TickLadderAccumulator()
 
-    # 使用 itertuples 提升遍历性能
-    Row = None
-    for row in df.itertuples(index=True, name="Row"):
-        ts = row.Index
+    for i in range(n_rows):
+        ts = times[i]
         # per-second fields
-        t_o = float(row.trade_open); t_h = float(row.trade_high)
-        t_l = float(row.trade_low);  t_c = float(row.trade_close)
-        vol = float(row.trade_volume or 0.0)
-        b_o = float(row.bid_open);   b_h = float(row.bid_high)
-        b_l = float(row.bid_low);    b_c = float(row.bid_close)
-        a_o = float(row.ask_open);   a_h = float(row.ask_high)
-        a_l = float(row.ask_low);    a_c = float(row.ask_close)
+        t_o = t_o_l[i]; t_h = t_h_l[i]
+        t_l = t_l_l[i]; t_c = t_c_l[i]
+        vol = vol_l[i]
 
         if curr_start is None:
             curr_start = ts
@@ -230,27 +191,13 @@ def build_v_footprints(
             trade_low = t_l
             trade_close = t_c
 
-        # micro allocation at second granularity
-        buy_v, sell_v, deltas = micro_allocate_volume_raw(
-            t_o, t_h, t_l, t_c, vol,
-            b_o, b_h, b_l, b_c,
-            a_o, a_h, a_l, a_c,
-            tick_size=tick_size,
-        )
-
         total_volume_sum += vol
-        buy_volume_sum += buy_v
-        sell_volume_sum += sell_v
+        buy_volume_sum += buy_tot_l[i]
+        sell_volume_sum += sell_tot_l[i]
 
         # accumulate per-price buckets as integer ticks
-        for price_bucket, incs in deltas.items():
-            tick_int = _to_tick_int(price_bucket, tick_size)
-            entry = bucket_map.get(tick_int)
-            if entry is None:
-                bucket_map[tick_int] = [incs.get("ask", 0.0), incs.get("bid", 0.0)]
-            else:
-                entry[0] += incs.get("ask", 0.0)
-                entry[1] += incs.get("bid", 0.0)
+        j0, j1 = bounds[i], bounds[i + 1]
+        ladder.add(ticks[j0:j1], buy_c[j0:j1], sell_c[j0:j1])
 
         # update OHLC
         if t_h > trade_high:
@@ -262,7 +209,7 @@ def build_v_footprints(
 
         # cut if reached threshold (>= V)
         if total_volume_sum >= v_threshold:
-            bar = _finalize_bar(
+            bar = _finalize_ladder_bar(
                 start_time=curr_start,
                 end_time=curr_end,
                 trade_open=trade_open,
@@ -272,7 +219,7 @@ def build_v_footprints(
                 total_volume_sum=total_volume_sum,
                 buy_volume_sum=buy_volume_sum,
                 sell_volume_sum=sell_volume_sum,
-                price_bucket_to_buy_sell={k: (v[0], v[1]) for k, v in bucket_map.items()},
+                ladder=ladder,
                 tick_size=tick_size,
             )
             bars.append(bar)
@@ -286,11 +233,11 @@ def build_v_footprints(
             total_volume_sum = 0.0
             buy_volume_sum = 0.0
             sell_volume_sum = 0.0
-            bucket_map.clear()
+            ladder.clear()
 
     # tail bar if any residual
     if total_volume_sum > 0.0 and curr_start is not None:
-        bar = _finalize_bar(
+        bar = _finalize_ladder_bar(
             start_time=curr_start,
             end_time=curr_end if curr_end is not None else curr_start,
             trade_open=trade_open,
@@ -300,22 +247,283 @@ def build_v_footprints(
             total_volume_sum=total_volume_sum,
             buy_volume_sum=buy_volume_sum,
             sell_volume_sum=sell_volume_sum,
-            price_bucket_to_buy_sell={k: (v[0], v[1]) for k, v in bucket_map.items()},
+            ladder=ladder,
             tick_size=tick_size,
         )
         bars.append(bar)
 
-    if not bars:
-        return pd.DataFrame(columns=[
-            "trade_date", "start_time", "end_time",
-            "open_i", "high_i", "low_i", "close_i",
-            "total_volume", "buy_volume", "sell_volume",
-            "prices_i", "vol_buy", "vol_sell",
-        ])
-
-    df_out = pd.DataFrame(bars)
-    # sort by start_time to ensure deterministic order
-    df_out = df_out.sort_values(by=["start_time"]).reset_index(drop=True)
-    return df_out
+    return FootprintBatch.from_records(bars)
+
+
+def _cut_bars_vectorized(
+    times: pd.DatetimeIndex,
+    cols: Dict[str, np.ndarray],
+    alloc: Tuple[np.ndarray, ...],
+    v_threshold: int,
+    tick_size: float,
+) -> FootprintBatch:
+    """
+    与 _cut_bars_loop 逐位一致的分段实现（要求成交量为整数，累计和无舍入误差）：
+      - 切分点：对累计成交量 searchsorted(上一切分累计 + V)，循环次数 = bar 数而非秒数
+      - open/close 取段首/段尾，high/low 用 maximum/minimum.reduceat
+      - 买卖总量与价阶按 bincount 顺序累加（价阶按各 bar 的稠密 tick 区间偏移，无排序），与逐秒累加的浮点求和顺序相同
+      - 整数化用分段最大余数法一次完成，直接产出 FootprintBatch（不逐 bar 调用 _finalize_bar）
+    """
+    starts, ends = _volume_segments(cols["trade_volume"], v_threshold)
+    return _bars_from_segments(times, cols, alloc, starts, ends, tick_size)
+
+
+def _check_v_unit(v_unit: int) -> int:
+    """V 须为正整数：V <= 0 时切分点不前进（searchsorted 停在原处），切分循环不会结束。"""
+    v_threshold = int(v_unit)
+    if v_threshold <= 0:
+        raise ValueError(f"v_unit must be a positive integer, got {v_unit!r}")
+    return v_threshold
+
+
+def _volume_segments(vol: np.ndarray, v_threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """V 切分点（"cut when accumulated >= V, keep the tail"）：返回各段首/尾秒的下标（闭区间）。"""
+    n_rows = vol.size
+    cum = np.cumsum(vol)
+    starts_l: List[int] = []
+    ends_l: List[int] = []
+    s = 0
+    base = 0.0
+    while s < n_rows:
+        e = int(np.searchsorted(cum, base + v_threshold, side="left"))
+        if e >= n_rows:
+            e = n_rows - 1
+        starts_l.append(s)
+        ends_l.append(e)
+        base = cum[e]
+        s = e + 1
+    return np.asarray(starts_l, dtype=np.int64), np.asarray(ends_l, dtype=np.int64)
+
+
+def _time_segments(times: pd.DatetimeIndex, period: timedelta) -> Tuple[np.ndarray, np.ndarray]:
+    """时间切分点：按 times.floor(period) 分桶（只含有成交的秒），返回各桶首/尾秒的下标（闭区间）。"""
+    bucket = times.floor(pd.Timedelta(period)).asi8
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1]))).astype(np.int64)
+    ends = np.append(starts[1:] - 1, bucket.size - 1).astype(np.int64)
+    return starts, ends
+
+
+def _bars_from_segments(
+    times: pd.DatetimeIndex,
+    cols: Dict[str, np.ndarray],
+    alloc: Tuple[np.ndarray, ...],
+    starts: np.ndarray,
+    ends: np.ndarray,
+    tick_size: float,
+) -> FootprintBatch:
+    """给定秒级分段 [starts[b], ends[b]]，一次性计算各 bar 的字段、价阶与整数化结果。"""
+    buy_tot, sell_tot, sec_idx, ticks, buy_c, sell_c = alloc
+    vol = cols["trade_volume"]
+    n_bars = starts.size
+
+    highs = np.maximum.reduceat(cols["trade_high"], starts)
+    lows = np.minimum.reduceat(cols["trade_low"], starts)
+    bar_of_sec = np.repeat(np.arange(n_bars, dtype=np.int64), ends - starts + 1)
+    totals = np.bincount(bar_of_sec, weights=vol, minlength=n_bars)
+    buys = np.bincount(bar_of_sec, weights=buy_tot, minlength=n_bars)
+    sells = np.bincount(bar_of_sec, weights=sell_tot, minlength=n_bars)
+
+    # per (bar, tick) ladder in one segmented pass over dense per-bar tick ranges
+    if ticks.size > 0:
+        con_bar = bar_of_sec[sec_idx]
+        first = np.searchsorted(con_bar, np.arange(n_bars))
+        has = first < np.append(first[1:], con_bar.size)
+        # reduceat over the bars that have contributions only, scattered back (empty bars: [0, -1])
+        bar_lo = np.zeros(n_bars, dtype=np.int64)
+        bar_hi = np.full(n_bars, -1, dtype=np.int64)
+        bar_lo[has] = np.minimum.reduceat(ticks, first[has])
+        bar_hi[has] = np.maximum.reduceat(ticks, first[has])
+        widths = bar_hi - bar_lo + 1
+        bar_off = np.concatenate(([0], np.cumsum(widths)))
+        dense = bar_off[con_bar] + (ticks - bar_lo[con_bar])
+        lad_buy = np.bincount(dense, weights=buy_c, minlength=int(bar_off[-1]))
+        lad_sell = np.bincount(dense, weights=sell_c, minlength=int(bar_off[-1]))
+        lad_tick = np.repeat(bar_lo - bar_off[:-1], widths) + np.arange(int(bar_off[-1]))
+        # drop untouched (zero) levels
+        keep = (lad_buy != 0.0) | (lad_sell != 0.0)
+        lad_bounds = np.concatenate(([0], np.cumsum(keep)))[bar_off].tolist()
+        lad_buy = lad_buy[keep]
+        lad_sell = lad_sell[keep]
+        lad_tick = lad_tick[keep]
+    else:
+        lad_buy = lad_sell = np.empty(0, dtype=float)
+        lad_tick = np.empty(0, dtype=np.int64)
+        lad_bounds = [0] * (n_bars + 1)
+
+    # integerize all bars at once (same apportionment as _finalize_bar, segmented per bar)
+    lad_off = np.asarray(lad_bounds, dtype=np.int64)
+    has_lad = np.diff(lad_off) > 0
+    total_int = np.maximum(np.rint(totals), 0).astype(np.int64)
+    side_int = _round_segments_preserve_total(
+        np.column_stack((buys, sells)).ravel(), np.arange(0, 2 * n_bars + 1, 2), total_int,
+    ).reshape(n_bars, 2)
+    side_int[~has_lad] = 0
+    buy_int = _round_segments_preserve_total(lad_buy, lad_off, side_int[:, 0])
+    sell_int = _round_segments_preserve_total(lad_sell, lad_off, side_int[:, 1])
+
+    start_times = times[starts]
+    return FootprintBatch(
+        trade_date=start_times.year * 10000 + start_times.month * 100 + start_times.day,
+        start_time=start_times.values,
+        end_time=times[ends].values,
+        open_i=_to_tick_int_array(cols["trade_open"][starts], tick_size),
+        high_i=_to_tick_int_array(highs, tick_size),
+        low_i=_to_tick_int_array(lows, tick_size),
+        close_i=_to_tick_int_array(cols["trade_close"][ends], tick_size),
+        total_volume=total_int,
+        buy_volume=np.diff(np.concatenate(([0], np.cumsum(buy_int)))[lad_off]),
+        sell_volume=np.diff(np.concatenate(([0], np.cumsum(sell_int)))[lad_off]),
+        prices_i=lad_tick,
+        vol_buy=buy_int,
+        vol_sell=sell_int,
+        offsets=lad_off,
+    )
+
+
+def build_time_footprints_from_arrays(
+    times: pd.DatetimeIndex,
+    cols: Dict[str, np.ndarray],
+    alloc: Tuple[np.ndarray, ...],
+    period: timedelta,
+    tick_size: float,
+    output: str = "frame",
+) -> pd.DataFrame | FootprintBatch:
+    """
+    由已分配的秒级数组切分时间 bar（按 times.floor(period) 分桶，仅含有成交的秒），字段与整数化同 V-bar。
+    start_time/end_time 为桶内首/尾有成交的秒（与 V-bar 一致）。
+    """
+    if output not in ("frame", "batch"):
+        raise ValueError(f"unknown output: {output}")
+    if times is None or len(times) == 0:
+        return _empty_output(output)
+    starts, ends = _time_segments(times, period)
+    batch = _bars_from_segments(times, cols, alloc, starts, ends, tick_size)
+    return batch if output == "batch" else batch.to_dataframe()
+
+
+def _empty_output(output: str) -> pd.DataFrame | FootprintBatch:
+    if output == "batch":
+        return FootprintBatch.empty()
+    return pd.DataFrame(columns=FOOTPRINT_COLUMNS)
+
+
+def build_v_footprints(
+    df_second: pd.DataFrame,
+    v_unit: int,
+    tick_size: float,
+    cut_mode: str = "vectorized",
+    allocation_mode: str = "sampled",
+    output: str = "frame",
+    alpha: float = 1.0,
+    n_min: int = 9,
+    n_max: int = 90,
+) -> pd.DataFrame | FootprintBatch:
+    """
+    将当日秒级 RAW 数据聚合为按成交量单位 V 的 footprint V-bar 列表。
+    约束：
+      - 末尾不足 V 的尾巴保留为一根 bar
+      - 使用整数 tick（round(price / tick_size)）
+      - 成交量使用整数；买卖拆分与价格阶梯按 allocation_mode：
+        "sampled" 使用 micro_allocate_batch（整日向量化，与逐秒 micro_allocate_volume_raw 结果逐位一致）；
+        "analytic" 使用 micro_allocate_batch_analytic（沿 O->H->L->C 路径的闭式积分，即采样 n->inf 的极限）；
+        alpha / n_min / n_max 为 sampled 的微观样本数参数（n = clip(alpha * 成交量, n_min, n_max)）
+      - 时间戳保持为原始（交易所）时区的 naive datetime，不做调整
+      - cut_mode="vectorized"：累计成交量 + searchsorted 求切分点，reduceat/bincount 计算各 bar 字段；
+        cut_mode="loop"：逐秒累加器。两者结果逐位一致（非整数成交量时自动回退 loop 以保证语义一致）
+    输入 df_second 要求包含 HISTORY_DF_FIELD_MAP 对应的字段，并索引或列含时间列 'time'
+    返回列：
+      trade_date(int32 YYYYMMDD), start_time, end_time,
+      open_i, high_i, low_i, close_i (all int32 ticks),
+      total_volume(int64), buy_volume(int64), sell_volume(int64),
+      prices_i(list<int32>), vol_buy(list<int32>), vol_sell(list<int32>)
+    output="batch" 时返回同样字段的 FootprintBatch（平铺价阶 + int32 offsets），不构造逐 bar 的 list
+    """
+    if output not in ("frame", "batch"):
+        raise ValueError(f"unknown output: {output}")
+    _check_v_unit(v_unit)
+    prepared = prepare_second_arrays(df_second)
+    if prepared is None:
+        return _empty_output(output)
+
+    # Whole-day micro allocation: one vectorized pass instead of one call per second
+    times, cols = prepared
+    alloc = allocate_day(cols, tick_size=tick_size, mode=allocation_mode, alpha=alpha, n_min=n_min, n_max=n_max)
+    return build_v_footprints_from_arrays(times, cols, alloc, v_unit, tick_size, cut_mode=cut_mode, output=output)
+
+
+def prepare_second_arrays(df_second: pd.DataFrame) -> Tuple[pd.DatetimeIndex, Dict[str, np.ndarray]] | None:
+    """
+    build_v_footprints 的输入整理：时间索引、重命名为内部字段、去空值与零成交秒。
+    返回 (times, cols)，cols 为 HISTORY_DF_FIELD_MAP 内部名 -> float64 数组；无可用数据时返回 None。
+    """
+    if df_second is None or df_second.empty:
+        return None
+
+    # Normalize time index (避免不必要的 copy)
+    if "time" in df_second.columns:
+        df_second["time"] = pd.to_datetime(df_second["time"])
+        df = df_second.set_index("time")
+    else:
+        # assume DatetimeIndex
+        df = df_second
+        if not isinstance(df.index, pd.DatetimeIndex):
+            raise ValueError("df_second must have a DatetimeIndex or a 'time' column")
+    df = df.sort_index()
+
+    # Rename to internal names
+    df = df.rename(columns=HISTORY_DF_FIELD_MAP)
+    required_cols = list(HISTORY_DF_FIELD_MAP.values())
+    if not all(col in df.columns for col in required_cols):
+        # Strict: if any leg missing, return empty
+        return None
+    df = df[required_cols].dropna()
+    if 'trade_volume' in df.columns:
+        df = df[df['trade_volume'] > 0]
+
+    if df.empty:
+        return None
+    return df.index, {c: df[c].to_numpy(dtype=np.float64) for c in required_cols}
+
+
+def build_v_footprints_from_arrays(
+    times: pd.DatetimeIndex,
+    cols: Dict[str, np.ndarray],
+    alloc: Tuple[np.ndarray, ...],
+    v_unit: int,
+    tick_size: float,
+    cut_mode: str = "vectorized",
+    output: str = "frame",
+    trade_date: int | None = None,
+) -> pd.DataFrame | FootprintBatch:
+    """
+    由已分配的秒级数组切分 V-bar（build_v_footprints 的后半段）：
+    times/cols 来自 prepare_second_arrays 或持久化的秒级分配层（footprint_storage.read_second_layer，
+    只需 trade_* 字段），alloc 为 allocate_day 的输出。同一份秒级分配可切出任意 v_unit。
+    trade_date 给定时所有 bar 记为该交易日（交易所交易日跨越本地午夜时，不按 start_time 的日期拆分）。
+    """
+    if output not in ("frame", "batch"):
+        raise ValueError(f"unknown output: {output}")
+    v_threshold = _check_v_unit(v_unit)
+    if times is None or len(times) == 0:
+        return _empty_output(output)
+    vol = cols["trade_volume"]
+    if cut_mode == "vectorized" and np.array_equal(vol, np.floor(vol)):
+        batch = _cut_bars_vectorized(times, cols, alloc, v_threshold, tick_size)
+    elif cut_mode in ("vectorized", "loop"):
+        batch = _cut_bars_loop(times, cols, alloc, v_threshold, tick_size)
+    else:
+        raise ValueError(f"unknown cut_mode: {cut_mode}")
+
+    if len(batch) == 0:
+        return _empty_output(output)
+    if trade_date is not None:
+        batch.trade_date = np.full(len(batch), trade_date, dtype=np.int32)
+    # bars are produced in start_time order (index is sorted above)
+    return batch if output == "batch" else batch.to_dataframe()
 
 
@@ -3,11 +3,17 @@ from typing import Dict, Optional
 from datetime import datetime, timedelta
 import numpy as np
 
+def _as_volume_array(values) -> np.ndarray:
+    """价阶成交量：默认 int32；已是 int64 的数组保持 int64，避免大 V 聚合结果被截断。"""
+    arr = np.asarray(values)
+    return arr if arr.dtype == np.int64 else arr.astype(np.int32, copy=False)
+
+
 class FootprintBar(TradeBar):
     """精简版 FootprintBar：继承 TradeBar，内部用整数tick存储，属性映射为浮点价格；footprint 明细使用 numpy。
     - 仅持久化整数价 open_i/high_i/low_i/close_i；浮点 open/high/low/close 通过 tick_size 映射
     - volume 等于总成交量，同时保留 total_volume 以兼容旧逻辑
-    - footprint 明细以 numpy 数组承载：prices_i_np, vol_buy_np, vol_sell_np（均为 int32）
+    - footprint 明细以 numpy 数组承载：prices_i_np, vol_buy_np, vol_sell_np（int32；二次聚合的大 V 价阶量可为 int64，不截断）
     - 提供兼容的 volume_at_price 字典视图（懒构造）
     """
     def __init__(self, symbol: Symbol, period: timedelta, tick_size: float):
@@ -109,8 +115,8 @@ class FootprintBar(TradeBar):
     # footprint 明细
     def set_ladder(self, prices_i: np.ndarray, vol_buy: np.ndarray, vol_sell: np.ndarray) -> None:
         self.prices_i_np = np.asarray(prices_i, dtype=np.int32)
-        self.vol_buy_np = np.asarray(vol_buy, dtype=np.int32)
-        self.vol_sell_np = np.asarray(vol_sell, dtype=np.int32)
+        self.vol_buy_np = _as_volume_array(vol_buy)
+        self.vol_sell_np = _as_volume_array(vol_sell)
         self._vap_cache = None
 
     @property
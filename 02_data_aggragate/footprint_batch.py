@@ -0,0 +1,228 @@
+from AlgorithmImports import *
+from typing import List, Sequence, Tuple
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+# 价阶成交量的 dtype 规则与 FootprintBar 共用（int32，int64 保持不变；写入时做范围检查）
+from footprint_bar import _as_volume_array
+
+
+FOOTPRINT_COLUMNS = [
+    "trade_date", "start_time", "end_time",
+    "open_i", "high_i", "low_i", "close_i",
+    "total_volume", "buy_volume", "sell_volume",
+    "prices_i", "vol_buy", "vol_sell",
+]
+
+
+def _as_datetime64(values) -> np.ndarray:
+    arr = np.asarray(values)
+    if arr.dtype.kind != "M":
+        arr = pd.DatetimeIndex(arr).values
+    return arr
+
+
+class FootprintBatch:
+    """列式 V-bar 批：一行一根 bar，价阶明细平铺存放，不为每根 bar 构造 Python 对象。
+    - 标量列：trade_date(int32), start_time/end_time(datetime64), open_i/high_i/low_i/close_i(int32),
+      total_volume/buy_volume/sell_volume(int64)
+    - 价阶：prices_i/vol_buy/vol_sell 为平铺数组（int32；二次聚合的价阶量为 int64），第 i 根 bar 占 offsets[i]:offsets[i+1]
+    - offsets 为 int32，长度 = bar 数 + 1，与 Arrow ListArray 的 offsets 布局一致，可直接零拷贝包装
+    """
+    def __init__(
+        self,
+        trade_date: np.ndarray,
+        start_time: np.ndarray,
+        end_time: np.ndarray,
+        open_i: np.ndarray,
+        high_i: np.ndarray,
+        low_i: np.ndarray,
+        close_i: np.ndarray,
+        total_volume: np.ndarray,
+        buy_volume: np.ndarray,
+        sell_volume: np.ndarray,
+        prices_i: np.ndarray,
+        vol_buy: np.ndarray,
+        vol_sell: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.trade_date = np.asarray(trade_date, dtype=np.int32)
+        self.start_time = _as_datetime64(start_time)
+        self.end_time = _as_datetime64(end_time)
+        self.open_i = np.asarray(open_i, dtype=np.int32)
+        self.high_i = np.asarray(high_i, dtype=np.int32)
+        self.low_i = np.asarray(low_i, dtype=np.int32)
+        self.close_i = np.asarray(close_i, dtype=np.int32)
+        self.total_volume = np.asarray(total_volume, dtype=np.int64)
+        self.buy_volume = np.asarray(buy_volume, dtype=np.int64)
+        self.sell_volume = np.asarray(sell_volume, dtype=np.int64)
+        self.prices_i = np.asarray(prices_i, dtype=np.int32)
+        self.vol_buy = _as_volume_array(vol_buy)
+        self.vol_sell = _as_volume_array(vol_sell)
+        self.offsets = np.asarray(offsets, dtype=np.int32)
+        if self.offsets.size != self.trade_date.size + 1:
+            raise ValueError("offsets must have one more entry than there are bars")
+
+    def __len__(self) -> int:
+        return int(self.trade_date.size)
+
+    @property
+    def nbytes(self) -> int:
+        """所有列数组占用的字节数（用于内存预算）。"""
+        return int(sum(getattr(self, name).nbytes for name in FOOTPRINT_COLUMNS) + self.offsets.nbytes)
+
+    @classmethod
+    def empty(cls) -> "FootprintBatch":
+        i32 = np.empty(0, dtype=np.int32)
+        i64 = np.empty(0, dtype=np.int64)
+        ts = np.empty(0, dtype="datetime64[ns]")
+        return cls(i32, ts, ts, i32, i32, i32, i32, i64, i64, i64, i32, i32, i32, np.zeros(1, dtype=np.int32))
+
+    @classmethod
+    def from_records(cls, records: Sequence[dict]) -> "FootprintBatch":
+        """由 _finalize_bar 产出的逐 bar 记录（价阶为数组）拼成列式批。"""
+        if not records:
+            return cls.empty()
+        lengths = np.fromiter((len(r["prices_i"]) for r in records), dtype=np.int64, count=len(records))
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+        def _flat(key: str) -> np.ndarray:
+            return np.concatenate([np.asarray(r[key], dtype=np.int32) for r in records])
+
+        def _col(key: str, dtype) -> np.ndarray:
+            return np.fromiter((r[key] for r in records), dtype=dtype, count=len(records))
+
+        return cls(
+            trade_date=_col("trade_date", np.int32),
+            start_time=pd.DatetimeIndex([r["start_time"] for r in records]).values,
+            end_time=pd.DatetimeIndex([r["end_time"] for r in records]).values,
+            open_i=_col("open_i", np.int32),
+            high_i=_col("high_i", np.int32),
+            low_i=_col("low_i", np.int32),
+            close_i=_col("close_i", np.int32),
+            total_volume=_col("total_volume", np.int64),
+            buy_volume=_col("buy_volume", np.int64),
+            sell_volume=_col("sell_volume", np.int64),
+            prices_i=_flat("prices_i"),
+            vol_buy=_flat("vol_buy"),
+            vol_sell=_flat("vol_sell"),
+            offsets=offsets,
+        )
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "FootprintBatch":
+        """由 build_v_footprints 的 DataFrame 形态（列表列）转换；列表只被迭代一次，不再经过 to_list。"""
+        if df is None or df.empty:
+            return cls.empty()
+        lengths = np.fromiter((len(x) for x in df["prices_i"]), dtype=np.int64, count=len(df))
+        n_levels = int(lengths.sum())
+
+        def _flat(key: str) -> np.ndarray:
+            return np.fromiter(chain.from_iterable(df[key]), dtype=np.int32, count=n_levels)
+
+        return cls(
+            trade_date=df["trade_date"].to_numpy(dtype=np.int32),
+            start_time=pd.to_datetime(df["start_time"]).to_numpy(),
+            end_time=pd.to_datetime(df["end_time"]).to_numpy(),
+            open_i=df["open_i"].to_numpy(dtype=np.int32),
+            high_i=df["high_i"].to_numpy(dtype=np.int32),
+            low_i=df["low_i"].to_numpy(dtype=np.int32),
+            close_i=df["close_i"].to_numpy(dtype=np.int32),
+            total_volume=df["total_volume"].to_numpy(dtype=np.int64),
+            buy_volume=df["buy_volume"].to_numpy(dtype=np.int64),
+            sell_volume=df["sell_volume"].to_numpy(dtype=np.int64),
+            prices_i=_flat("prices_i"),
+            vol_buy=_flat("vol_buy"),
+            vol_sell=_flat("vol_sell"),
+            offsets=np.concatenate(([0], np.cumsum(lengths))),
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["FootprintBatch"]) -> "FootprintBatch":
+        """按给定顺序拼接多个批（offsets 依次平移）。"""
+        batches = [b for b in batches if b is not None and len(b) > 0]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        shifts = np.cumsum([0] + [int(b.offsets[-1]) for b in batches[:-1]])
+        offsets = np.concatenate(
+            [np.zeros(1, dtype=np.int64)] + [b.offsets[1:].astype(np.int64) + s for b, s in zip(batches, shifts)]
+        )
+
+        def _cat(name: str) -> np.ndarray:
+            return np.concatenate([getattr(b, name) for b in batches])
+
+        return cls(
+            trade_date=_cat("trade_date"),
+            start_time=_cat("start_time"),
+            end_time=_cat("end_time"),
+            open_i=_cat("open_i"),
+            high_i=_cat("high_i"),
+            low_i=_cat("low_i"),
+            close_i=_cat("close_i"),
+            total_volume=_cat("total_volume"),
+            buy_volume=_cat("buy_volume"),
+            sell_volume=_cat("sell_volume"),
+            prices_i=_cat("prices_i"),
+            vol_buy=_cat("vol_buy"),
+            vol_sell=_cat("vol_sell"),
+            offsets=offsets,
+        )
+
+    def ladder(self, i: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """第 i 根 bar 的价阶视图 (prices_i, vol_buy, vol_sell)，不拷贝。"""
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.prices_i[a:b], self.vol_buy[a:b], self.vol_sell[a:b]
+
+    def _split_ladder(self, flat: np.ndarray) -> List[list]:
+        return [x.tolist() for x in np.split(flat, self.offsets[1:-1])] if len(self) > 0 else []
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """转换为 build_v_footprints 的 DataFrame 形态（列表列为 Python list）。"""
+        return pd.DataFrame({
+            "trade_date": self.trade_date,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "open_i": self.open_i,
+            "high_i": self.high_i,
+            "low_i": self.low_i,
+            "close_i": self.close_i,
+            "total_volume": self.total_volume,
+            "buy_volume": self.buy_volume,
+            "sell_volume": self.sell_volume,
+            "prices_i": self._split_ladder(self.prices_i),
+            "vol_buy": self._split_ladder(self.vol_buy),
+            "vol_sell": self._split_ladder(self.vol_sell),
+        }, columns=FOOTPRINT_COLUMNS)
+
+    def to_footprint_bars(self, symbol: object, tick_size: float) -> List[object]:
+        """仅在需要对象时构造 FootprintBar 列表；价阶数组为批内切片视图。"""
+        from footprint_bar import FootprintBar
+
+        starts = pd.DatetimeIndex(self.start_time).to_pydatetime()
+        ends = pd.DatetimeIndex(self.end_time).to_pydatetime()
+        bars: List[FootprintBar] = []
+        for i in range(len(self)):
+            start_time_py = starts[i]
+            end_time_py = ends[i]
+            fp = FootprintBar(symbol, end_time_py - start_time_py, tick_size)
+            fp.reset(start_time_py)
+
+            fp.trade_date = int(self.trade_date[i])
+            fp.open_i = int(self.open_i[i])
+            fp.high_i = int(self.high_i[i])
+            fp.low_i = int(self.low_i[i])
+            fp.close_i = int(self.close_i[i])
+
+            fp.volume = int(self.total_volume[i])
+            fp.total_volume = fp.volume
+            fp.buy_volume = int(self.buy_volume[i])
+            fp.sell_volume = int(self.sell_volume[i])
+            fp.delta = fp.buy_volume - fp.sell_volume
+
+            fp.set_ladder(*self.ladder(i))
+            fp.finalize(end_time_py)
+            bars.append(fp)
+        return bars
@@ -0,0 +1,129 @@
+from AlgorithmImports import *
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+
+# symbol key -> SecurityExchangeHours（None 表示无法从数据库解析）
+_EXCHANGE_HOURS_CACHE: Dict[str, object] = {}
+# (symbol key, start, end, extended_market_hours) -> 开市日列表
+_TRADING_DAYS_CACHE: Dict[Tuple[str, date, date, bool], List[date]] = {}
+
+
+def _symbol_key(symbol: object) -> str:
+    return str(getattr(symbol, "value", symbol))
+
+
+def get_exchange_hours(symbol: object):
+    """
+    由 MarketHoursDatabase 取 symbol 的 SecurityExchangeHours（按 symbol 缓存，数据库只加载一次）。
+    symbol 须为 LEAN Symbol（需要 market 与 security_type）；无法解析时返回 None。
+    """
+    key = _symbol_key(symbol)
+    if key in _EXCHANGE_HOURS_CACHE:
+        return _EXCHANGE_HOURS_CACHE[key]
+    try:
+        mhdb = MarketHoursDatabase.from_data_folder()
+        hours = mhdb.get_exchange_hours(symbol.id.market, symbol, symbol.security_type)
+    except Exception:
+        hours = None
+    _EXCHANGE_HOURS_CACHE[key] = hours
+    return hours
+
+
+def _is_date_open(hours, d: date, extended_market_hours: bool) -> bool:
+    local = datetime(d.year, d.month, d.day)
+    try:
+        return bool(hours.is_date_open(local, extended_market_hours))
+    except TypeError:
+        # 旧版 LEAN 的 IsDateOpen 不带 extendedMarketHours 参数
+        return bool(hours.is_date_open(local))
+
+
+def trading_days(
+    symbol: object,
+    start_date: date,
+    end_date: date,
+    extended_market_hours: bool = True,
+) -> List[date]:
+    """
+    [start_date, end_date] 内交易所有开市时段的日期（周末、节假日剔除；期货周日晚盘按开市计）。
+    整个区间计算一次并缓存；交易时间不可得时退化为全部自然日（与逐日遍历一致）。
+    """
+    key = (_symbol_key(symbol), start_date, end_date, bool(extended_market_hours))
+    cached = _TRADING_DAYS_CACHE.get(key)
+    if cached is not None:
+        return list(cached)
+
+    days: List[date] = []
+    d = start_date
+    one = timedelta(days=1)
+    while d <= end_date:
+        days.append(d)
+        d += one
+
+    hours = get_exchange_hours(symbol)
+    if hours is not None:
+        try:
+            days = [d for d in days if _is_date_open(hours, d, extended_market_hours)]
+        except Exception:
+            pass
+    _TRADING_DAYS_CACHE[key] = days
+    return list(days)
+
+
+# (symbol key, date, extended_market_hours, time zone) -> 开市时段外包区间
+_SESSION_WINDOW_CACHE: Dict[Tuple[str, date, bool, str], Tuple[datetime, datetime] | None] = {}
+
+
+def _as_timedelta(value) -> timedelta:
+    # pythonnet 通常已把 TimeSpan 转为 timedelta；否则读 TotalSeconds
+    if isinstance(value, timedelta):
+        return value
+    return timedelta(seconds=float(getattr(value, "total_seconds", getattr(value, "TotalSeconds", 0))))
+
+
+def _convert_time_zone(dt: datetime, from_tz, to_tz) -> datetime:
+    # 换算失败时抛出（由 session_window 退化为整日窗口），不返回未换算的时间
+    if to_tz is None or from_tz is None:
+        return dt
+    return Extensions.convert_to(dt, from_tz, to_tz)
+
+
+def session_window(
+    symbol: object,
+    d: date,
+    extended_market_hours: bool = True,
+    time_zone=None,
+) -> Tuple[datetime, datetime] | None:
+    """
+    交易日 d 的开市时段外包区间 [首段开始, 末段结束]（extended_market_hours 时含盘前 / 盘后段），
+    由 SecurityExchangeHours 的当日（交易所时区）segments 得到；time_zone（如 qb.time_zone）给定时整体换算过去，
+    不裁剪到 time_zone 的自然日：交易所时区与 time_zone 不同时窗口可跨越本地午夜，相邻交易日的窗口首尾相接，
+    并集覆盖全部开市时段。交易时间不可得或时区换算失败时返回整日 [d 00:00, d+1 00:00]；当日无开市时段返回 None。
+    """
+    day_start = datetime(d.year, d.month, d.day)
+    day_end = day_start + timedelta(days=1)
+    key = (_symbol_key(symbol), d, bool(extended_market_hours), str(time_zone))
+    if key in _SESSION_WINDOW_CACHE:
+        return _SESSION_WINDOW_CACHE[key]
+
+    window: Tuple[datetime, datetime] | None = (day_start, day_end)
+    hours = get_exchange_hours(symbol)
+    if hours is not None:
+        try:
+            segments = []
+            for seg in hours.get_market_hours(day_start).segments:
+                state = str(seg.state).upper()
+                if "CLOSED" in state or (not extended_market_hours and state.rsplit(".", 1)[-1] != "MARKET"):
+                    continue
+                segments.append((day_start + _as_timedelta(seg.start), day_start + _as_timedelta(seg.end)))
+            if not segments:
+                window = None
+            else:
+                start = _convert_time_zone(min(s for s, _ in segments), hours.time_zone, time_zone)
+                end = _convert_time_zone(max(e for _, e in segments), hours.time_zone, time_zone)
+                window = (start, end) if start < end else None
+        except Exception:
+            window = (day_start, day_end)
+    _SESSION_WINDOW_CACHE[key] = window
+    return window
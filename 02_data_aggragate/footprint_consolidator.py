@@ -4,7 +4,9 @@ from datetime import datetime, timedelta
 from footprint_bar import FootprintBar
 from footprint_field_mapping import HISTORY_DF_FIELD_MAP
 import pandas as pd
-from footprint_utils import micro_allocate_volume_raw
+import numpy as np
+from footprint_utils import micro_allocate_into, micro_allocate_volume_raw, TickLadderAccumulator
+from footprint_aggregator import _round_series_preserve_total
 
 
 def create_footprints_from_history(df_history: pd.DataFrame, period: timedelta, tick_size: float) -> List[FootprintBar]:
@@ -38,6 +40,10 @@ def create_footprints_from_history(df_history: pd.DataFrame, period: timedelta,
     footprint_bars: List[FootprintBar] = []
     current_fp: FootprintBar = None
     current_end: datetime = None
+    # per-bar ladder, dense by integer tick, handed to the bar at finalize;
+    # without a tick grid prices stay exact floats and go straight into volume_at_price
+    ladder = TickLadderAccumulator()
+    exact_prices = not (tick_size and tick_size > 0)
 
     # Local aggregators for OHLC to avoid per-second QuoteBar/TradeBar creation
     trade_open = None
@@ -82,6 +88,20 @@ def create_footprints_from_history(df_history: pd.DataFrame, period: timedelta,
             return b
         current_fp.bid = make_bar(bid_open, bid_high, bid_low, bid_close)
         current_fp.ask = make_bar(ask_open, ask_high, ask_low, ask_close)
+        if exact_prices:
+            return
+        # integer ladder as in the V-bar path: each side sums exactly to its share of the rounded total
+        ticks, buys, sells = ladder.finalize()
+        ladder.clear()
+        if ticks.size == 0:
+            return
+        total_int = max(int(round(current_fp.total_volume)), 0)
+        side_int = _round_series_preserve_total(np.array([buys.sum(), sells.sum()], dtype=float), total_int)
+        current_fp.set_ladder(
+            ticks,
+            _round_series_preserve_total(buys, int(side_int[0])),
+            _round_series_preserve_total(sells, int(side_int[1])),
+        )
 
     for row in df_filtered.itertuples():
         ts: datetime = row.Index
@@ -123,12 +143,30 @@ def create_footprints_from_history(df_history: pd.DataFrame, period: timedelta,
             ask_open, ask_high, ask_low, ask_close = a_o, a_h, a_l, a_c
 
         # micro allocation using raw scalars
-        buy_v, sell_v, deltas = micro_allocate_volume_raw(
-            t_o, t_h, t_l, t_c, vol,
-            b_o, b_h, b_l, b_c,
-            a_o, a_h, a_l, a_c,
-            tick_size=tick_size,
-        )
+        if exact_prices:
+            buy_v, sell_v, deltas = micro_allocate_volume_raw(
+                t_o, t_h, t_l, t_c, vol,
+                b_o, b_h, b_l, b_c,
+                a_o, a_h, a_l, a_c,
+                tick_size=tick_size,
+            )
+            vap = current_fp.volume_at_price
+            for price_bucket, incs in deltas.items():
+                e = vap.get(price_bucket)
+                if e is None:
+                    vap[price_bucket] = {"bid": incs.get("bid", 0.0), "ask": incs.get("ask", 0.0)}
+                else:
+                    e["bid"] += incs.get("bid", 0.0)
+                    e["ask"] += incs.get("ask", 0.0)
+        else:
+            # per-tick volumes go straight into the bar's ladder
+            buy_v, sell_v, _, _, _ = micro_allocate_into(
+                t_o, t_h, t_l, t_c, vol,
+                b_o, b_h, b_l, b_c,
+                a_o, a_h, a_l, a_c,
+                tick_size=tick_size,
+                into=ladder,
+            )
 
         # totals
         current_fp.total_volume += float(vol or 0.0)
@@ -136,16 +174,6 @@ def create_footprints_from_history(df_history: pd.DataFrame, period: timedelta,
         current_fp.sell_volume += sell_v
         current_fp.delta = current_fp.buy_volume - current_fp.sell_volume
 
-        # per price
-        vap = current_fp.volume_at_price
-        for price_bucket, incs in deltas.items():
-            e = vap.get(price_bucket)
-            if e is None:
-                vap[price_bucket] = {"bid": incs.get("bid", 0.0), "ask": incs.get("ask", 0.0)}
-            else:
-                e["bid"] += incs.get("bid", 0.0)
-                e["ask"] += incs.get("ask", 0.0)
-
         # update OHLC aggregators
         # trade
         if trade_high is None or t_h > trade_high:
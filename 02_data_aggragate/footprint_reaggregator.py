@@ -6,28 +6,87 @@ from datetime import date, timedelta
 import numpy as np
 
 from footprint_bar import FootprintBar
-from footprint_storage import read_day_as_footprint_bars, DATA_ROOT_DEFAULT
+from footprint_batch import FootprintBatch
+from footprint_storage import (
+    iter_range_day_batches,
+    read_metadata,
+    list_pyramid_levels,
+    get_level_root,
+    DATA_ROOT_DEFAULT,
+)
+
+def _merge_ladder_segments(
+    prices_i: np.ndarray,
+    vol_buy: np.ndarray,
+    vol_sell: np.ndarray,
+    bounds: np.ndarray,
+) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """
+    价阶合并内核（_merge_ladders / aggregate_batch 共用）：第 g 段为 [bounds[g], bounds[g+1])，每段内按 tick 求和。
+    各段映射到自身的稠密 tick 区间 [min, max] 后一次 bincount 完成，无排序；出现过的 tick 全部保留（含零量价阶）。
+    成交量以 int64 返回（bincount 的 float64 累加对 < 2**53 的整数精确），大 V 聚合不会像 int32 那样溢出。
+    返回 (offsets, prices_i, vol_buy, vol_sell)。
+    """
+    n_seg = bounds.size - 1
+    lo_flat, hi_flat = int(bounds[0]), int(bounds[-1])
+    prices_i, vol_buy, vol_sell = prices_i[lo_flat:hi_flat], vol_buy[lo_flat:hi_flat], vol_sell[lo_flat:hi_flat]
+    bounds = bounds - lo_flat
+    if prices_i.size == 0:
+        return np.zeros(n_seg + 1, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if n_seg == 1:
+        # single group (_merge_ladders): no per-segment bookkeeping needed
+        ticks = prices_i.astype(np.int64)
+        lo = int(ticks.min())
+        dense = ticks - lo
+        n_dense = int(ticks.max()) - lo + 1
+        seen = np.bincount(dense, minlength=n_dense) > 0
+        buy = np.bincount(dense, weights=vol_buy, minlength=n_dense)[seen].astype(np.int64)
+        sell = np.bincount(dense, weights=vol_sell, minlength=n_dense)[seen].astype(np.int64)
+        prices = (np.flatnonzero(seen) + lo).astype(np.int32)
+        return np.array([0, prices.size], dtype=np.int64), prices, buy, sell
+    widths_in = np.diff(bounds)
+    has = widths_in > 0
+    seg = np.repeat(np.arange(n_seg, dtype=np.int64), widths_in)
+    ticks = prices_i.astype(np.int64)
+    # reduceat only over the non-empty segments (their starts are strictly increasing), then scatter back;
+    # empty segments get an empty dense range [0, -1]
+    first = bounds[:-1][has]
+    lo = np.zeros(n_seg, dtype=np.int64)
+    hi = np.full(n_seg, -1, dtype=np.int64)
+    lo[has] = np.minimum.reduceat(ticks, first)
+    hi[has] = np.maximum.reduceat(ticks, first)
+    widths = hi - lo + 1
+    dense_off = np.concatenate(([0], np.cumsum(widths)))
+    dense = dense_off[seg] + (ticks - lo[seg])
+    n_dense = int(dense_off[-1])
+    seen = np.bincount(dense, minlength=n_dense) > 0
+    buy = np.bincount(dense, weights=vol_buy, minlength=n_dense)
+    sell = np.bincount(dense, weights=vol_sell, minlength=n_dense)
+    dense_tick = np.repeat(lo - dense_off[:-1], widths) + np.arange(n_dense)
+    offsets = np.concatenate(([0], np.cumsum(seen)))[dense_off]
+    return offsets, dense_tick[seen].astype(np.int32), buy[seen].astype(np.int64), sell[seen].astype(np.int64)
+
 
 def _merge_ladders(bars_to_merge: List[FootprintBar]) -> (np.ndarray, np.ndarray, np.ndarray):
-    """使用 numpy 高效合并多个 footprint bar 的价阶。"""
+    """使用 numpy 高效合并多个 footprint bar 的价阶（稠密 tick 区间 + bincount，无排序，int64 累加）。"""
     if not bars_to_merge:
-        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
 
     # 拼接所有子 bar 的 numpy 数组
     all_prices_i = np.concatenate([b.prices_i_np for b in bars_to_merge])
     all_vol_buy = np.concatenate([b.vol_buy_np for b in bars_to_merge])
     all_vol_sell = np.concatenate([b.vol_sell_np for b in bars_to_merge])
 
-    # 找到唯一的 tick 并加总成交量
-    unique_prices, inverse_indices = np.unique(all_prices_i, return_inverse=True)
-    
-    merged_vol_buy = np.zeros(unique_prices.shape, dtype=np.int32)
-    np.add.at(merged_vol_buy, inverse_indices, all_vol_buy)
+    _, prices, buys, sells = _merge_ladder_segments(
+        all_prices_i, all_vol_buy, all_vol_sell, np.array([0, all_prices_i.size], dtype=np.int64),
+    )
+    return prices, buys, sells
 
-    merged_vol_sell = np.zeros(unique_prices.shape, dtype=np.int32)
-    np.add.at(merged_vol_sell, inverse_indices, all_vol_sell)
+def _check_target_v(target_v: int) -> None:
+    """target_v 须为正：target_v <= 0 时分组边界不前进，切分循环不会结束。"""
+    if not target_v > 0:
+        raise ValueError(f"target_v must be positive, got {target_v!r}")
 
-    return unique_prices.astype(np.int32), merged_vol_buy, merged_vol_sell
 
 def aggregate_vbars(
     vbars_iter: Iterator[FootprintBar],
@@ -38,6 +97,7 @@ def aggregate_vbars(
     从 FootprintBar 迭代器中读取 bar，并按更大的成交量目标（target_v）进行二次聚合。
     这是一个生成器，逐个产出聚合后的 FootprintBar。
     """
+    _check_target_v(target_v)
     buffer: List[FootprintBar] = []
     accumulated_volume = 0.0
     first_bar_in_group: FootprintBar = None
@@ -103,6 +163,67 @@ def aggregate_vbars(
         
         yield agg_bar
 
+def _segment_sums(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """整数列按 [starts[g], ends[g]] 闭区间分段求和（int64，精确）。"""
+    cs = np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+    return cs[ends + 1] - cs[starts]
+
+
+def aggregate_batch(batch: FootprintBatch, target_v: int, keep_partial_tail: bool = True) -> FootprintBatch:
+    """
+    aggregate_vbars 的列式版本（输入输出均为 FootprintBatch，结果与其逐字段一致）：
+      - 分组边界：累计成交量 searchsorted(上一边界累计 + target_v)，循环次数 = 输出 bar 数
+      - open/close 取组首/组尾，high/low 与各成交量用 reduceat
+      - 价阶按组一次分段合并（_merge_ladder_segments）
+    需要对象时再调用 FootprintBatch.to_footprint_bars。
+    """
+    _check_target_v(target_v)
+    n = len(batch)
+    if n == 0:
+        return FootprintBatch.empty()
+    cum = np.cumsum(batch.total_volume)
+    starts_l: List[int] = []
+    ends_l: List[int] = []
+    s = 0
+    base = 0
+    while s < n:
+        e = int(np.searchsorted(cum, base + target_v, side="left"))
+        if e >= n:
+            if not keep_partial_tail:
+                break
+            e = n - 1
+        starts_l.append(s)
+        ends_l.append(e)
+        base = int(cum[e])
+        s = e + 1
+    if not starts_l:
+        return FootprintBatch.empty()
+    starts = np.asarray(starts_l, dtype=np.int64)
+    ends = np.asarray(ends_l, dtype=np.int64)
+    stop = int(ends[-1]) + 1  # rows past stop form a dropped partial tail
+
+    offsets, prices_i, vol_buy, vol_sell = _merge_ladder_segments(
+        batch.prices_i, batch.vol_buy, batch.vol_sell,
+        batch.offsets[np.append(starts, stop)].astype(np.int64),
+    )
+    return FootprintBatch(
+        trade_date=batch.trade_date[starts],
+        start_time=batch.start_time[starts],
+        end_time=batch.end_time[ends],
+        open_i=batch.open_i[starts],
+        high_i=np.maximum.reduceat(batch.high_i[:stop], starts),
+        low_i=np.minimum.reduceat(batch.low_i[:stop], starts),
+        close_i=batch.close_i[ends],
+        total_volume=_segment_sums(batch.total_volume, starts, ends),
+        buy_volume=_segment_sums(batch.buy_volume, starts, ends),
+        sell_volume=_segment_sums(batch.sell_volume, starts, ends),
+        prices_i=prices_i,
+        vol_buy=vol_buy,
+        vol_sell=vol_sell,
+        offsets=offsets,
+    )
+
+
 def _daterange_days(start_date: date, end_date: date) -> List[date]:
     days: List[date] = []
     d = start_date
@@ -120,14 +241,71 @@ def read_and_aggregate_range(
     data_root: str = DATA_ROOT_DEFAULT,
     keep_partial_tail: bool = True
 ) -> Iterator[FootprintBar]:
-    """便利接口：读取并二次聚合一个日期区间的数据，按日流式产出聚合后的 bar。"""
-    all_days = _daterange_days(start_date, end_date)
-    for day in all_days:
-        year = day.year
-        trade_date_int = day.year * 10000 + day.month * 100 + day.day
-        
-        base_bars = read_day_as_footprint_bars(symbol, year, trade_date_int, data_root=data_root)
-        if not base_bars:
+    """
+    便利接口：读取并二次聚合一个日期区间的数据，按日流式产出聚合后的 bar。
+    每个年度文件只扫描一次（逐 row group = 逐日解码），元数据中缺失/无数据的日期直接跳过；
+    聚合仍按日独立进行（每日尾巴按 keep_partial_tail 处理），与逐日读取的结果一致。
+    """
+    _check_target_v(target_v)
+    tick_size_by_year = {}
+    for agg in iter_aggregate_range_batches(symbol, start_date, end_date, target_v, data_root, keep_partial_tail):
+        year = int(agg.trade_date[0]) // 10000
+        if year not in tick_size_by_year:
+            meta = read_metadata(symbol, year, data_root)
+            if not meta or "tick_size" not in meta:
+                raise ValueError("tick_size not provided and not found in metadata")
+            tick_size_by_year[year] = float(meta["tick_size"])
+        yield from agg.to_footprint_bars(symbol, tick_size_by_year[year])
+
+
+def iter_aggregate_range_batches(
+    symbol: object,
+    start_date: date,
+    end_date: date,
+    target_v: int,
+    data_root: str = DATA_ROOT_DEFAULT,
+    keep_partial_tail: bool = True
+) -> Iterator[FootprintBatch]:
+    """列式接口：单次扫描区间并按日二次聚合，逐日产出 FootprintBatch，不构造 FootprintBar。"""
+    _check_target_v(target_v)
+    for day_batch in iter_range_day_batches(symbol, start_date, end_date, data_root=data_root):
+        agg = aggregate_batch(day_batch, target_v, keep_partial_tail)
+        if len(agg) > 0:
+            yield agg
+
+
+def iter_range_batches_at_v(
+    symbol: object,
+    start_date: date,
+    end_date: date,
+    target_v: int,
+    data_root: str = DATA_ROOT_DEFAULT,
+    keep_partial_tail: bool = True,
+    exact_only: bool = True,
+) -> Iterator[FootprintBatch]:
+    """
+    按目标 V 读取区间，优先使用已存储的金字塔层（footprint_storage.build_pyramid_levels），逐日产出 FootprintBatch：
+      - 默认（exact_only=True）只使用 L == target_v 的层，直接读出（无需计算，与从基础层聚合逐位一致），
+        否则回退为从基础层二次聚合（iter_aggregate_range_batches）；结果始终与 read_and_aggregate_range 相同
+      - exact_only=False 时允许从能整除 target_v 的最大可用层 L < target_v 二次聚合以换取速度：
+        切分点以 L 层 bar 为最小单位，结果是近似值（bar 边界可能晚于从基础层聚合，bar 数可能更少）
+    """
+    _check_target_v(target_v)
+    for year in range(start_date.year, end_date.year + 1):
+        y_start = max(start_date, date(year, 1, 1))
+        y_end = min(end_date, date(year, 12, 31))
+        levels = [lv for lv in list_pyramid_levels(symbol, year, data_root) if target_v % lv == 0]
+        if exact_only:
+            levels = [lv for lv in levels if lv == target_v]
+        if not levels:
+            yield from iter_aggregate_range_batches(symbol, y_start, y_end, target_v, data_root, keep_partial_tail)
             continue
-            
-        yield from aggregate_vbars(iter(base_bars), target_v, keep_partial_tail)
\ No newline at end of file
+        level_v = levels[-1]
+        level_root = get_level_root(symbol, level_v, data_root)
+        for day_batch in iter_range_day_batches(symbol, y_start, y_end, data_root=level_root):
+            if level_v == target_v and keep_partial_tail:
+                yield day_batch
+                continue
+            agg = aggregate_batch(day_batch, target_v, keep_partial_tail)
+            if len(agg) > 0:
+                yield agg
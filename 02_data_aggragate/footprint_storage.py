@@ -3,19 +3,66 @@ from AlgorithmImports import *
 import json
 import os
 from datetime import datetime
-from typing import Dict, Iterable, List, Set
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
 
 import numpy as np
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
 from datetime import timedelta
 from datetime import date
 
+from footprint_batch import FootprintBatch, FOOTPRINT_COLUMNS
+from footprint_utils import allocation_config_hash, artifact_config, artifact_config_hash, normalize_allocation_config
+
 
 DATA_ROOT_DEFAULT = "/LeanCLI/footprint_data"
 
 
+def get_store_root(
+    data_root: str = DATA_ROOT_DEFAULT,
+    v_unit: int | None = None,
+    allocation_config: Dict | None = None,
+) -> str:
+    """
+    按 (v_unit, 分配参数 hash) 划分的存储根目录：data_root/v{V}_{hash}/，其下仍是 symbol/year.parquet。
+    不同 V 或不同分配参数的构建互不干扰，可并存、按需查询；所有读写函数以返回值作为 data_root 即可。
+    v_unit=None 时返回 data_root 本身（旧版无命名空间布局）。
+    """
+    if v_unit is None:
+        return data_root
+    return os.path.join(data_root, f"v{int(v_unit)}_{allocation_config_hash(allocation_config)}")
+
+
+def write_store_manifest(store_root: str, v_unit: int, allocation_config: Dict | None = None) -> None:
+    """在命名空间根目录写入 store.json（v_unit 与完整分配参数），供 list_stores 查询。"""
+    path = os.path.join(store_root, "store.json")
+    _ensure_dirs(path)
+    manifest = {
+        "v_unit": int(v_unit),
+        "allocation_config": normalize_allocation_config(allocation_config),
+        "allocation_config_hash": allocation_config_hash(allocation_config),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def list_stores(data_root: str = DATA_ROOT_DEFAULT) -> List[Dict]:
+    """列出 data_root 下所有命名空间存储（每项含 store_root / v_unit / allocation_config）。"""
+    if not os.path.isdir(data_root):
+        return []
+    out: List[Dict] = []
+    for name in sorted(os.listdir(data_root)):
+        path = os.path.join(data_root, name, "store.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            manifest["store_root"] = os.path.join(data_root, name)
+            out.append(manifest)
+    return out
+
+
 def get_symbol_dir(symbol: object, data_root: str = DATA_ROOT_DEFAULT) -> str:
     return os.path.join(data_root, _sanitize_symbol(symbol))
 
@@ -24,6 +71,27 @@ def get_year_file_path(symbol: object, year: int, data_root: str = DATA_ROOT_DEF
     return os.path.join(get_symbol_dir(symbol, data_root), f"{int(year)}.parquet")
 
 
+def get_day_dir(symbol: object, year: int, data_root: str = DATA_ROOT_DEFAULT) -> str:
+    return os.path.join(get_symbol_dir(symbol, data_root), f"{int(year)}")
+
+
+def get_day_file_path(symbol: object, year: int, trade_date: int, data_root: str = DATA_ROOT_DEFAULT) -> str:
+    return os.path.join(get_day_dir(symbol, year, data_root), f"{int(trade_date)}.parquet")
+
+
+def list_day_fragments(symbol: object, year: int, data_root: str = DATA_ROOT_DEFAULT) -> Dict[int, str]:
+    """day 布局下该年已写入的日分片：trade_date -> 文件路径。"""
+    day_dir = get_day_dir(symbol, year, data_root)
+    if not os.path.isdir(day_dir):
+        return {}
+    out: Dict[int, str] = {}
+    for name in os.listdir(day_dir):
+        stem, ext = os.path.splitext(name)
+        if ext == ".parquet" and stem.isdigit():
+            out[int(stem)] = os.path.join(day_dir, name)
+    return out
+
+
 def get_metadata_path(symbol: object, year: int, data_root: str = DATA_ROOT_DEFAULT) -> str:
     return os.path.join(get_symbol_dir(symbol, data_root), f"{int(year)}_meta.json")
 
@@ -32,6 +100,58 @@ def _ensure_dirs(path: str) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
 
 
+def _write_json_atomic(path: str, obj: Dict) -> None:
+    # 临时文件 + fsync + 原子替换：中断时元数据要么是旧版本要么是新版本，不会写坏
+    _ensure_dirs(path)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def get_journal_path(symbol: object, data_root: str = DATA_ROOT_DEFAULT) -> str:
+    return os.path.join(get_symbol_dir(symbol, data_root), "progress.jsonl")
+
+
+def append_progress_journal(symbol: object, data_root: str, record: Dict) -> None:
+    """
+    进度日志：每次提交（数据与元数据已落盘）后追加一行 JSON 并 fsync。日志只记录已提交的内容，
+    中断后可据此查看 / 续跑；缺口判断仍以元数据为准。
+    """
+    path = get_journal_path(symbol, data_root)
+    _ensure_dirs(path)
+    line = json.dumps({"time": datetime.utcnow().isoformat(timespec="seconds") + "Z", **record}, ensure_ascii=False)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_progress_journal(symbol: object, data_root: str = DATA_ROOT_DEFAULT) -> List[Dict]:
+    """读取进度日志（忽略中断时写了一半的末行）。"""
+    path = get_journal_path(symbol, data_root)
+    if not os.path.exists(path):
+        return []
+    records: List[Dict] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def committed_dates_from_journal(symbol: object, data_root: str = DATA_ROOT_DEFAULT) -> Set[int]:
+    """进度日志中已提交的交易日（含无数据日）。"""
+    out: Set[int] = set()
+    for rec in read_progress_journal(symbol, data_root):
+        out.update(int(x) for x in rec.get("dates", []))
+        out.update(int(x) for x in rec.get("no_data_dates", []))
+    return out
+
+
 def _symbol_to_string(symbol: object) -> str:
     # Prefer QC Symbol.value if present
     if hasattr(symbol, "value"):
@@ -63,9 +183,11 @@ def write_metadata(
     year: int,
     v_unit: int,
     tick_size: float,
-    df_year: pd.DataFrame,
+    df_year: pd.DataFrame | pa.Table,
     data_root: str = DATA_ROOT_DEFAULT,
     no_data_dates: Iterable[int] | None = None,
+    extra_fields: Dict | None = None,
+    config_hash_by_date: Dict[int, str] | None = None,
 ) -> None:
     meta_path = get_metadata_path(symbol, year, data_root)
     _ensure_dirs(meta_path)
@@ -82,7 +204,20 @@ def write_metadata(
         except Exception:
             existing = {}
 
-    if df_year is None or df_year.empty:
+    # trade_date -> row group of the year file, taken from its footer (fragments are not in it)
+    year_path = get_year_file_path(symbol, year, data_root)
+    rg_index = _row_group_index_from_footer(year_path) if os.path.exists(year_path) else None
+    rg_fields = {
+        "row_group_count": len(rg_index) if rg_index is not None else None,
+        "row_group_by_date": {k: rg_index[k] for k in sorted(rg_index)} if rg_index is not None else {},
+    }
+    # 每日的构建配置 hash（artifact_config_hash）：沿用旧记录，本次写入的日覆盖
+    config_hashes = {int(k): v for k, v in existing.get("config_hash_by_date", {}).items()}
+    # 每次写入元数据递增的修订号（last_updated 只到秒，同一秒内的多次写入无法区分）
+    revision = int(existing.get("revision", 0)) + 1
+    config_hashes.update({int(k): v for k, v in (config_hash_by_date or {}).items()})
+
+    if df_year is None or len(df_year) == 0:
         meta = {
             "symbol": sym_str,
             "year": int(year),
@@ -90,13 +225,17 @@ def write_metadata(
             "tick_size": float(tick_size),
             "dates_present": [],
             "bar_count_by_date": {},
+            "config_hash_by_date": {},
             "no_data_dates": sorted(list(set(int(x) for x in existing.get("no_data_dates", [])) | no_data_set)),
             "last_updated": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "revision": revision,
             "schema_version": 1,
+            **rg_fields,
+            **(extra_fields or {}),
         }
     else:
-        g = df_year.groupby("trade_date")
-        bar_counts = {int(k): int(v) for k, v in g.size().to_dict().items()}
+        td_values, td_counts = np.unique(np.asarray(df_year["trade_date"]), return_counts=True)
+        bar_counts = {int(k): int(v) for k, v in zip(td_values.tolist(), td_counts.tolist())}
         dates_present = sorted([int(x) for x in bar_counts.keys()])
         meta = {
             "symbol": sym_str,
@@ -105,33 +244,82 @@ def write_metadata(
             "tick_size": float(tick_size),
             "dates_present": dates_present,
             "bar_count_by_date": bar_counts,
+            "config_hash_by_date": {k: config_hashes[k] for k in dates_present if k in config_hashes},
             "no_data_dates": sorted(list(set(int(x) for x in existing.get("no_data_dates", [])) | no_data_set)),
             "last_updated": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "revision": revision,
             "schema_version": 1,
+            **rg_fields,
+            **(extra_fields or {}),
         }
 
-    with open(meta_path, "w", encoding="utf-8") as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
+    _write_json_atomic(meta_path, meta)
+
+
+def update_metadata_days(
+    symbol: object,
+    year: int,
+    v_unit: int,
+    tick_size: float,
+    bar_count_by_date: Dict[int, int],
+    data_root: str = DATA_ROOT_DEFAULT,
+    no_data_dates: Iterable[int] | None = None,
+    config_hash_by_date: Dict[int, str] | None = None,
+) -> None:
+    """
+    增量更新元数据：只合并本次写入日的 bar 数、构建配置 hash 与无数据日，不读取 Parquet。
+    元数据不存在时先由现有文件重建一次（仅读 trade_date 列）。
+    """
+    meta = read_metadata(symbol, year, data_root)
+    if not meta:
+        write_metadata(
+            symbol=symbol, year=year, v_unit=v_unit, tick_size=tick_size,
+            df_year=_read_year_table(symbol, year, None, data_root, columns=["trade_date"]),
+            data_root=data_root,
+        )
+        meta = read_metadata(symbol, year, data_root)
+
+    bar_counts = {int(k): int(v) for k, v in meta.get("bar_count_by_date", {}).items()}
+    bar_counts.update({int(k): int(v) for k, v in bar_count_by_date.items()})
+    no_data_set = set(int(x) for x in meta.get("no_data_dates", [])) | set(int(x) for x in (no_data_dates or []))
+    config_hashes = {int(k): v for k, v in meta.get("config_hash_by_date", {}).items()}
+    config_hashes.update({int(k): v for k, v in (config_hash_by_date or {}).items()})
+    meta.update({
+        "symbol": _sanitize_symbol(symbol),
+        "year": int(year),
+        "v_unit": int(v_unit),
+        "tick_size": float(tick_size),
+        "dates_present": sorted(bar_counts.keys()),
+        "bar_count_by_date": {k: bar_counts[k] for k in sorted(bar_counts)},
+        "config_hash_by_date": {k: config_hashes[k] for k in sorted(bar_counts) if k in config_hashes},
+        "no_data_dates": sorted(no_data_set),
+        "last_updated": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "revision": int(meta.get("revision", 0)) + 1,
+        "schema_version": 1,
+    })
+    meta_path = get_metadata_path(symbol, year, data_root)
+    _write_json_atomic(meta_path, meta)
 
 
 def read_present_dates(symbol: object, year: int, data_root: str = DATA_ROOT_DEFAULT) -> Set[int]:
     meta = read_metadata(symbol, year, data_root)
     if meta and "dates_present" in meta:
         return set(int(x) for x in meta["dates_present"])
+    fragments = set(list_day_fragments(symbol, year, data_root).keys())
     year_path = get_year_file_path(symbol, year, data_root)
     if not os.path.exists(year_path):
-        return set()
+        return fragments
     try:
         pf = pq.ParquetFile(year_path)
         col = pf.read(columns=["trade_date"]).column(0).to_numpy()
-        return set(int(x) for x in np.unique(col))
+        return set(int(x) for x in np.unique(col)) | fragments
     except Exception:
         # fallback: load via pandas
         try:
             df = pd.read_parquet(year_path, engine="pyarrow", columns=["trade_date"])
-            return set(int(x) for x in df["trade_date"].unique().tolist())
+            return set(int(x) for x in df["trade_date"].unique().tolist()) | fragments
         except Exception:
-            return set()
+            return fragments
 
 
 def detect_missing_dates(
@@ -140,13 +328,28 @@ def detect_missing_dates(
     target_dates: Iterable[int],
     force_recompute: bool,
     data_root: str = DATA_ROOT_DEFAULT,
+    v_unit: int | None = None,
+    config_hash: str | None = None,
 ) -> Set[int]:
+    """
+    缺口 = 目标 - 已有 - 无数据日。给定 config_hash（artifact_config_hash）时，元数据中以其他配置
+    构建的日期视为过期，一并返回重算；未记录 hash 的旧日期视为当前配置。
+    """
     target_set = set(int(d) for d in target_dates)
+    meta = read_metadata(symbol, year, data_root)
+    # 同一年度文件只能容纳一种 V；不一致时拒绝（否则会跳过日期或混写不兼容的 bar）
+    if v_unit is not None and meta and "v_unit" in meta and int(meta["v_unit"]) != int(v_unit):
+        raise ValueError(
+            f"store at {data_root} holds v_unit={meta['v_unit']} for {year}, requested {v_unit}; "
+            f"use get_store_root(data_root, v_unit, allocation_config) to keep builds apart"
+        )
     if force_recompute:
         return target_set
     present = read_present_dates(symbol, year, data_root)
-    meta = read_metadata(symbol, year, data_root)
     no_data = set(int(x) for x in meta.get("no_data_dates", [])) if meta else set()
+    if config_hash is not None and meta:
+        stale = {int(k) for k, v in meta.get("config_hash_by_date", {}).items() if v != config_hash}
+        present = present - stale
     # 缺口 = 目标 - 已有 - 无数据日
     return target_set - present - no_data
 
@@ -169,51 +372,62 @@ def _parquet_schema() -> pa.schema:
     ])
 
 
-def _df_to_table(df: pd.DataFrame) -> pa.Table:
-    # Ensure column order and types
-    cols = [
-        "trade_date", "start_time", "end_time",
-        "open_i", "high_i", "low_i", "close_i",
-        "total_volume", "buy_volume", "sell_volume",
-        "prices_i", "vol_buy", "vol_sell",
-    ]
-    df2 = df[cols]
-    # Convert to Arrow with explicit schema for list columns
-    return pa.Table.from_pydict(
-        {
-            "trade_date": df2["trade_date"].astype("int32").to_list(),
-            "start_time": df2["start_time"].to_list(),
-            "end_time": df2["end_time"].to_list(),
-            "open_i": df2["open_i"].astype("int32").to_list(),
-            "high_i": df2["high_i"].astype("int32").to_list(),
-            "low_i": df2["low_i"].astype("int32").to_list(),
-            "close_i": df2["close_i"].astype("int32").to_list(),
-            "total_volume": df2["total_volume"].astype("int64").to_list(),
-            "buy_volume": df2["buy_volume"].astype("int64").to_list(),
-            "sell_volume": df2["sell_volume"].astype("int64").to_list(),
-            "prices_i": df2["prices_i"].to_list(),
-            "vol_buy": df2["vol_buy"].to_list(),
-            "vol_sell": df2["vol_sell"].to_list(),
-        },
+def _list_column(values: np.ndarray, offsets: np.ndarray) -> pa.ListArray:
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), pa.array(values, type=pa.int32()))
+
+
+def _batch_to_table(batch: FootprintBatch) -> pa.Table:
+    """FootprintBatch -> Arrow 表：直接包装 NumPy 缓冲与 offsets（ListArray.from_arrays），不经过 Python list。"""
+    return pa.Table.from_arrays(
+        [
+            pa.array(batch.trade_date, type=pa.int32()),
+            pa.array(batch.start_time.astype("datetime64[ns]"), type=pa.timestamp("ns")),
+            pa.array(batch.end_time.astype("datetime64[ns]"), type=pa.timestamp("ns")),
+            pa.array(batch.open_i, type=pa.int32()),
+            pa.array(batch.high_i, type=pa.int32()),
+            pa.array(batch.low_i, type=pa.int32()),
+            pa.array(batch.close_i, type=pa.int32()),
+            pa.array(batch.total_volume, type=pa.int64()),
+            pa.array(batch.buy_volume, type=pa.int64()),
+            pa.array(batch.sell_volume, type=pa.int64()),
+            _list_column(batch.prices_i, batch.offsets),
+            _list_column(batch.vol_buy, batch.offsets),
+            _list_column(batch.vol_sell, batch.offsets),
+        ],
         schema=_parquet_schema(),
     )
 
 
-def _write_year_by_day_rowgroups(path_tmp: str, df_year: pd.DataFrame) -> None:
+def _df_to_table(df: pd.DataFrame) -> pa.Table:
+    # Ensure column order and types; list columns are flattened once into NumPy buffers + offsets
+    return _batch_to_table(FootprintBatch.from_dataframe(df[FOOTPRINT_COLUMNS]))
+
+
+def _to_table(day_result: pd.DataFrame | FootprintBatch | pa.Table) -> pa.Table:
+    """append_days 的输入可为 build_v_footprints 的 DataFrame、FootprintBatch 或已成型的 Arrow 表。"""
+    if isinstance(day_result, FootprintBatch):
+        return _batch_to_table(day_result)
+    if isinstance(day_result, pa.Table):
+        return day_result.select(FOOTPRINT_COLUMNS).cast(_parquet_schema())
+    return _df_to_table(day_result)
+
+
+def _write_year_by_day_rowgroups(path_tmp: str, table_year: pa.Table) -> None:
     """Write a full year parquet ensuring each 'trade_date' is its own row group, sorted by date then start_time."""
-    if df_year is None or df_year.empty:
+    _ensure_dirs(path_tmp)
+    if table_year is None or table_year.num_rows == 0:
         # Write empty file with schema
-        _ensure_dirs(path_tmp)
         with pq.ParquetWriter(path_tmp, _parquet_schema(), compression="snappy") as writer:
             pass
         return
-    df_sorted = df_year.sort_values(by=["trade_date", "start_time"]).reset_index(drop=True)
-    _ensure_dirs(path_tmp)
+    table_sorted = table_year.sort_by([("trade_date", "ascending"), ("start_time", "ascending")])
+    dates = table_sorted.column("trade_date").to_numpy()
+    # row-group boundaries: first row of every trade_date run
+    cuts = np.concatenate(([0], np.flatnonzero(dates[1:] != dates[:-1]) + 1, [dates.size]))
     writer = pq.ParquetWriter(path_tmp, _parquet_schema(), compression="snappy")
     try:
-        for td, df_day in df_sorted.groupby("trade_date"):
-            table = _df_to_table(df_day)
-            writer.write_table(table)
+        for a, b in zip(cuts[:-1].tolist(), cuts[1:].tolist()):
+            writer.write_table(table_sorted.slice(a, b - a))
     finally:
         writer.close()
 
@@ -222,64 +436,519 @@ def append_days(
     symbol: object,
     v_unit: int,
     year: int,
-    df_list_by_date: List[pd.DataFrame],
+    df_list_by_date: List[pd.DataFrame | FootprintBatch],
     tick_size: float,
     force_recompute_dates: Iterable[int] = (),
     data_root: str = DATA_ROOT_DEFAULT,
+    layout: str = "year",
+    config_hash: str | None = None,
 ) -> None:
     """
     将“多日”的 V-bar 结果写入该年度文件：
-      - 读取旧文件（若存在）
+      - 读取旧文件（若存在，Arrow 表，不转 pandas）
       - 移除被覆盖日（force_recompute_dates）
-      - 合并新增日
+      - 合并新增日（DataFrame 或 FootprintBatch，后者零拷贝转为 Arrow）
       - 以“日”为row group按顺序重写到临时文件，再原子替换
-      - 更新元数据
+      - 更新元数据（给定 config_hash 时记录为本次写入各日的构建配置，供 detect_missing_dates 判断过期）
+    layout="day"：每个交易日写成 symbol/year/YYYYMMDD.parquet 分片，只触碰本次写入的日（O(日)），
+    元数据增量更新；同日分片优先于年度文件中的旧行，由 compact_year 离线合并回年度文件。
     """
+    if layout == "day":
+        _append_day_fragments(symbol, v_unit, year, df_list_by_date, tick_size, data_root, config_hash)
+        return
+    if layout != "year":
+        raise ValueError(f"unknown layout: {layout}")
+
     year_path = get_year_file_path(symbol, year, data_root)
     tmp_path = year_path + ".tmp"
     _ensure_dirs(year_path)
 
     # Load existing
+    table_existing = None
     if os.path.exists(year_path):
         try:
-            df_existing = pd.read_parquet(year_path, engine="pyarrow")
+            table_existing = _to_table(pq.read_table(year_path, columns=FOOTPRINT_COLUMNS))
         except Exception:
-            df_existing = pd.DataFrame()
-    else:
-        df_existing = pd.DataFrame()
-
-    # Concatenate new daily data
-    df_new = pd.concat([df for df in df_list_by_date if df is not None and not df.empty], axis=0, ignore_index=True) \
-        if df_list_by_date else pd.DataFrame()
+            table_existing = None
 
     # Filter existing by removing force dates
-    if df_existing is not None and not df_existing.empty and force_recompute_dates:
-        force_set = set(int(x) for x in force_recompute_dates)
-        df_existing = df_existing[~df_existing["trade_date"].isin(list(force_set))]
-
-    # Merge
-    if df_existing is not None and not df_existing.empty and df_new is not None and not df_new.empty:
-        df_year = pd.concat([df_existing, df_new], axis=0, ignore_index=True)
-    elif df_existing is not None and not df_existing.empty:
-        df_year = df_existing
-    elif df_new is not None and not df_new.empty:
-        df_year = df_new
-    else:
-        df_year = pd.DataFrame(columns=[
-            "trade_date", "start_time", "end_time",
-            "open_i", "high_i", "low_i", "close_i",
-            "total_volume", "buy_volume", "sell_volume",
-            "prices_i", "vol_buy", "vol_sell",
-        ])
+    if table_existing is not None and table_existing.num_rows > 0 and force_recompute_dates:
+        force_set = pa.array(sorted(set(int(x) for x in force_recompute_dates)), type=pa.int32())
+        table_existing = table_existing.filter(pc.invert(pc.is_in(table_existing.column("trade_date"), value_set=force_set)))
+
+    # Merge with new daily data
+    tables_new = [_to_table(x) for x in (df_list_by_date or []) if x is not None and len(x) > 0]
+    tables = [table_existing] if table_existing is not None and table_existing.num_rows > 0 else []
+    table_year = pa.concat_tables(tables + tables_new) if tables or tables_new else _parquet_schema().empty_table()
 
     # Rewrite by day row groups
-    _write_year_by_day_rowgroups(tmp_path, df_year)
+    _write_year_by_day_rowgroups(tmp_path, table_year)
 
     # Atomic replace
     os.replace(tmp_path, year_path)
 
-    # Update metadata
-    write_metadata(symbol=symbol, year=year, v_unit=v_unit, tick_size=tick_size, df_year=df_year, data_root=data_root)
+    # Day fragments would shadow the rows just written; drop them, keep the rest counted in metadata
+    fragments = list_day_fragments(symbol, year, data_root)
+    written = set(int(x) for t in tables_new for x in np.unique(t.column("trade_date").to_numpy()))
+    for td in written & set(fragments):
+        os.remove(fragments.pop(td))
+
+    # Update metadata；write_metadata 只保留年度文件中各日的 hash，分片日的 hash 先取出再写回
+    prior_hashes = {int(k): v for k, v in read_metadata(symbol, year, data_root).get("config_hash_by_date", {}).items()}
+    write_metadata(
+        symbol=symbol, year=year, v_unit=v_unit, tick_size=tick_size, df_year=table_year, data_root=data_root,
+        config_hash_by_date={td: config_hash for td in written} if config_hash is not None else None,
+    )
+    if fragments:
+        update_metadata_days(
+            symbol, year, v_unit, tick_size,
+            {td: pq.ParquetFile(path).metadata.num_rows for td, path in fragments.items()},
+            data_root=data_root,
+            config_hash_by_date={td: prior_hashes[td] for td in fragments if td in prior_hashes},
+        )
+
+
+def _split_table_by_day(table: pa.Table) -> List[pa.Table]:
+    """按 trade_date 拆成日表（日内按 start_time 排序）。"""
+    if table.num_rows == 0:
+        return []
+    table = table.sort_by([("trade_date", "ascending"), ("start_time", "ascending")])
+    dates = table.column("trade_date").to_numpy()
+    cuts = np.concatenate(([0], np.flatnonzero(dates[1:] != dates[:-1]) + 1, [dates.size]))
+    return [table.slice(a, b - a) for a, b in zip(cuts[:-1].tolist(), cuts[1:].tolist())]
+
+
+def _append_day_fragments(
+    symbol: object,
+    v_unit: int,
+    year: int,
+    df_list_by_date: List[pd.DataFrame | FootprintBatch],
+    tick_size: float,
+    data_root: str,
+    config_hash: str | None = None,
+) -> None:
+    tables = [_to_table(x) for x in (df_list_by_date or []) if x is not None and len(x) > 0]
+    if not tables:
+        return
+    bar_counts: Dict[int, int] = {}
+    for table_day in _split_table_by_day(pa.concat_tables(tables)):
+        td = int(table_day.column("trade_date")[0].as_py())
+        path = get_day_file_path(symbol, year, td, data_root)
+        _ensure_dirs(path)
+        # 覆盖写同日分片（force 语义天然成立），临时文件 + 原子替换
+        pq.write_table(table_day, path + ".tmp", compression="snappy")
+        os.replace(path + ".tmp", path)
+        bar_counts[td] = table_day.num_rows
+    update_metadata_days(
+        symbol, year, v_unit, tick_size, bar_counts, data_root=data_root,
+        config_hash_by_date={td: config_hash for td in bar_counts} if config_hash is not None else None,
+    )
+
+
+def compact_year(symbol: object, year: int, data_root: str = DATA_ROOT_DEFAULT) -> int:
+    """
+    离线合并：将 symbol/year/ 下的日分片并入年度文件（每日一个 row group），分片日覆盖年度文件中的同日旧行。
+    v_unit / tick_size 取自元数据；成功替换年度文件后删除已合并的分片。返回合并的分片数。
+    """
+    fragments = list_day_fragments(symbol, year, data_root)
+    if not fragments:
+        return 0
+    meta = read_metadata(symbol, year, data_root)
+    if not meta or "v_unit" not in meta or "tick_size" not in meta:
+        raise ValueError(f"metadata with v_unit/tick_size required to compact year {year}")
+    frag_dates = sorted(fragments)
+    year_path = get_year_file_path(symbol, year, data_root)
+    tables = []
+    if os.path.exists(year_path):
+        table_existing = _to_table(pq.read_table(year_path, columns=FOOTPRINT_COLUMNS))
+        keep = pc.invert(pc.is_in(table_existing.column("trade_date"), value_set=pa.array(frag_dates, type=pa.int32())))
+        tables.append(table_existing.filter(keep))
+    tables += [_to_table(pq.read_table(fragments[td])) for td in frag_dates]
+    table_year = pa.concat_tables(tables)
+
+    tmp_path = year_path + ".tmp"
+    _write_year_by_day_rowgroups(tmp_path, table_year)
+    os.replace(tmp_path, year_path)
+    write_metadata(
+        symbol=symbol, year=year, v_unit=int(meta["v_unit"]), tick_size=float(meta["tick_size"]),
+        df_year=table_year, data_root=data_root,
+    )
+
+    for td in frag_dates:
+        os.remove(fragments[td])
+    try:
+        os.rmdir(get_day_dir(symbol, year, data_root))
+    except OSError:
+        pass
+    return len(frag_dates)
+
+
+def _row_group_index_from_footer(year_path: str) -> Dict[int, int] | None:
+    """
+    由 Parquet footer 的 trade_date 统计（min == max）得到 trade_date -> row group 序号。
+    只读 footer；若统计缺失或某个 row group 跨多日（非本模块写出的文件），返回 None。
+    """
+    try:
+        md = pq.ParquetFile(year_path).metadata
+    except Exception:
+        return None
+    col_idx = md.schema.to_arrow_schema().get_field_index("trade_date")
+    if col_idx < 0:
+        return None
+    index: Dict[int, int] = {}
+    for i in range(md.num_row_groups):
+        rg = md.row_group(i)
+        if rg.num_rows == 0:
+            continue
+        stats = rg.column(col_idx).statistics
+        if stats is None or not stats.has_min_max or stats.min != stats.max:
+            return None
+        index[int(stats.min)] = i
+    return index
+
+
+def _year_row_group_index(symbol: object, year: int, data_root: str = DATA_ROOT_DEFAULT) -> Dict[int, int] | None:
+    """元数据中的 row_group_by_date（与文件 row group 数一致时可信），否则回退 footer 统计。"""
+    year_path = get_year_file_path(symbol, year, data_root)
+    meta = read_metadata(symbol, year, data_root)
+    if meta and "row_group_by_date" in meta and meta.get("row_group_count") is not None:
+        try:
+            if pq.ParquetFile(year_path).metadata.num_row_groups == int(meta["row_group_count"]):
+                return {int(k): int(v) for k, v in meta["row_group_by_date"].items()}
+        except Exception:
+            pass
+    return _row_group_index_from_footer(year_path)
+
+
+def _read_year_table(
+    symbol: object,
+    year: int,
+    dates_int: List[int] | None,
+    data_root: str = DATA_ROOT_DEFAULT,
+    columns: List[str] | None = None,
+) -> pa.Table:
+    """
+    读取某年指定交易日（None = 全部）的行，透明合并两种布局：
+      - 日分片 symbol/year/YYYYMMDD.parquet（优先）
+      - 年度文件 symbol/year.parquet（剔除已有分片的日期）
+    """
+    columns = columns or FOOTPRINT_COLUMNS
+    schema = _parquet_schema()
+    out_schema = pa.schema([schema.field(c) for c in columns])
+    fragments = list_day_fragments(symbol, year, data_root)
+    wanted = None if dates_int is None else set(int(x) for x in dates_int)
+    frag_dates = sorted(td for td in fragments if wanted is None or td in wanted)
+
+    tables = []
+    year_path = get_year_file_path(symbol, year, data_root)
+    if os.path.exists(year_path) and (wanted is None or wanted - set(frag_dates)):
+        rg_index = _year_row_group_index(symbol, year, data_root) if wanted is not None else None
+        if rg_index is not None:
+            # one row group per trade_date: decode only the requested days
+            rgs = sorted(rg_index[td] for td in wanted - set(frag_dates) if td in rg_index)
+            if rgs:
+                table = pq.ParquetFile(year_path).read_row_groups(rgs, columns=columns)
+                tables.append(table.select(columns).cast(out_schema))
+        else:
+            filters = []
+            if wanted is not None:
+                filters.append(("trade_date", "in", sorted(wanted - set(frag_dates))))
+            elif frag_dates:
+                filters.append(("trade_date", "not in", frag_dates))
+            table = pq.read_table(year_path, columns=columns, filters=filters or None)
+            tables.append(table.select(columns).cast(out_schema))
+    for td in frag_dates:
+        tables.append(pq.read_table(fragments[td], columns=columns).select(columns).cast(out_schema))
+    if not tables:
+        return out_schema.empty_table()
+    return pa.concat_tables(tables)
+
+
+def _table_to_batch(table: pa.Table) -> FootprintBatch:
+    """Arrow 表 -> FootprintBatch：列表列直接取 values/offsets 缓冲，不经过 Python list。"""
+    table = table.select(FOOTPRINT_COLUMNS).combine_chunks()
+
+    def _col(name: str) -> np.ndarray:
+        return table.column(name).to_numpy()
+
+    def _list(name: str) -> Tuple[np.ndarray, np.ndarray]:
+        chunks = table.column(name).chunks
+        if not chunks:
+            return np.empty(0, dtype=np.int32), np.zeros(1, dtype=np.int32)
+        arr = chunks[0]
+        offsets = arr.offsets.to_numpy()
+        return arr.flatten().to_numpy(), offsets - offsets[0]
+
+    prices_i, offsets = _list("prices_i")
+    return FootprintBatch(
+        trade_date=_col("trade_date"),
+        start_time=_col("start_time"),
+        end_time=_col("end_time"),
+        open_i=_col("open_i"),
+        high_i=_col("high_i"),
+        low_i=_col("low_i"),
+        close_i=_col("close_i"),
+        total_volume=_col("total_volume"),
+        buy_volume=_col("buy_volume"),
+        sell_volume=_col("sell_volume"),
+        prices_i=prices_i,
+        vol_buy=_list("vol_buy")[0],
+        vol_sell=_list("vol_sell")[0],
+        offsets=offsets,
+    )
+
+
+def iter_range_day_batches(
+    symbol: object,
+    start_date: date,
+    end_date: date,
+    data_root: str = DATA_ROOT_DEFAULT,
+) -> Iterator[FootprintBatch]:
+    """
+    按日期顺序流式产出区间内每个有数据交易日的 FootprintBatch（一日一批）：
+      - 每个年度文件只打开一次，按 row group（= 一日）逐个解码，不重复读取全年
+      - 元数据的 dates_present / no_data_dates 用于跳过缺失日、周末与无数据日（无元数据时以文件内容为准）
+      - 日分片优先于年度文件中的同日行
+    """
+    start_td = start_date.year * 10000 + start_date.month * 100 + start_date.day
+    end_td = end_date.year * 10000 + end_date.month * 100 + end_date.day
+    for year in range(start_date.year, end_date.year + 1):
+        meta = read_metadata(symbol, year, data_root)
+        fragments = list_day_fragments(symbol, year, data_root)
+        year_path = get_year_file_path(symbol, year, data_root)
+        has_year_file = os.path.exists(year_path)
+        rg_index = _year_row_group_index(symbol, year, data_root) if has_year_file else None
+
+        dates_known = bool(meta) and "dates_present" in meta
+        if dates_known:
+            candidates = set(int(x) for x in meta["dates_present"])
+        else:
+            candidates = set(fragments) | (set(rg_index) if rg_index is not None else set())
+        candidates -= set(int(x) for x in (meta or {}).get("no_data_dates", []))
+        dates = sorted(td for td in candidates if start_td <= td <= end_td)
+
+        if has_year_file and rg_index is None:
+            # row groups span several days: one filtered scan of the year, split by day
+            wanted = [td for td in dates if td not in fragments] if dates_known else None
+            table = pq.read_table(
+                year_path, columns=FOOTPRINT_COLUMNS,
+                filters=[("trade_date", "in", wanted)] if wanted is not None else
+                [("trade_date", ">=", start_td), ("trade_date", "<=", end_td)],
+            )
+            by_day = {int(t.column("trade_date")[0].as_py()): t for t in _split_table_by_day(_to_table(table))}
+            dates = sorted(set(dates) | (set(by_day) - set(fragments)))
+        else:
+            by_day = {}
+
+        pf = pq.ParquetFile(year_path) if has_year_file and rg_index is not None else None
+        for td in dates:
+            if td in fragments:
+                table = pq.read_table(fragments[td], columns=FOOTPRINT_COLUMNS)
+            elif pf is not None and td in rg_index:
+                table = pf.read_row_group(rg_index[td], columns=FOOTPRINT_COLUMNS)
+            elif td in by_day:
+                table = by_day[td]
+            else:
+                continue
+            if table.num_rows > 0:
+                yield _table_to_batch(_to_table(table))
+
+
+def get_level_root(symbol: object, level_v: int, data_root: str = DATA_ROOT_DEFAULT) -> str:
+    """
+    金字塔层（按 level_v 预聚合的 V-bar）的存储根目录：symbol/levels/v{level_v}/。
+    其下是一套完整的同构存储（年度文件 + 元数据），所有读取函数以它为 data_root 即可复用。
+    """
+    return os.path.join(get_symbol_dir(symbol, data_root), "levels", f"v{int(level_v)}")
+
+
+def list_pyramid_levels(symbol: object, year: int, data_root: str = DATA_ROOT_DEFAULT) -> List[int]:
+    """
+    该年可用（与基础层同步）的金字塔层 V 列表；基础层在建层之后有更新的层视为过期，不返回。
+    以基础层元数据的修订号（每次写入递增）与 last_updated 判断，同一秒内的多次更新也能区分。
+    """
+    levels_dir = os.path.join(get_symbol_dir(symbol, data_root), "levels")
+    if not os.path.isdir(levels_dir):
+        return []
+    base_meta = read_metadata(symbol, year, data_root)
+    out: List[int] = []
+    for name in os.listdir(levels_dir):
+        if not (name.startswith("v") and name[1:].isdigit()):
+            continue
+        level_v = int(name[1:])
+        level_meta = read_metadata(symbol, year, get_level_root(symbol, level_v, data_root))
+        info = level_meta.get("pyramid_level") if level_meta else None
+        if (
+            info and base_meta
+            and info.get("base_revision") == base_meta.get("revision")
+            and info.get("base_last_updated") == base_meta.get("last_updated")
+        ):
+            out.append(level_v)
+    return sorted(out)
+
+
+def build_pyramid_levels(
+    symbol: object,
+    year: int,
+    level_vs: Iterable[int],
+    data_root: str = DATA_ROOT_DEFAULT,
+) -> Dict[int, int]:
+    """
+    由基础层预计算并存储若干金字塔层（例如 2x/5x/10x/20x V），每层与基础层同一目录树、同样按日 row group 存放。
+    聚合按日独立进行并保留每日尾巴（与 read_and_aggregate_range 的默认语义一致），因此 level_v 层与从基础层
+    现场二次聚合到 level_v 的结果逐位相同。层元数据记录基础层的 v_unit、修订号与 last_updated，用于判断是否过期。
+    返回 {level_v: bar 数}。
+    """
+    from footprint_reaggregator import aggregate_batch
+
+    base_meta = read_metadata(symbol, year, data_root)
+    if not base_meta or "tick_size" not in base_meta:
+        raise ValueError(f"base metadata required to build pyramid levels for year {year}")
+    level_vs = sorted(set(int(v) for v in level_vs))
+    per_level: Dict[int, List[FootprintBatch]] = {v: [] for v in level_vs}
+    for day_batch in iter_range_day_batches(symbol, date(int(year), 1, 1), date(int(year), 12, 31), data_root):
+        for level_v in level_vs:
+            per_level[level_v].append(aggregate_batch(day_batch, level_v, keep_partial_tail=True))
+
+    counts: Dict[int, int] = {}
+    for level_v in level_vs:
+        level_root = get_level_root(symbol, level_v, data_root)
+        level_path = get_year_file_path(symbol, year, level_root)
+        table_level = _batch_to_table(FootprintBatch.concat(per_level[level_v]))
+        _write_year_by_day_rowgroups(level_path + ".tmp", table_level)
+        os.replace(level_path + ".tmp", level_path)
+        write_metadata(
+            symbol=symbol,
+            year=year,
+            v_unit=level_v,
+            tick_size=float(base_meta["tick_size"]),
+            df_year=table_level,
+            data_root=level_root,
+            no_data_dates=base_meta.get("no_data_dates", []),
+            extra_fields={"pyramid_level": {
+                "base_v_unit": int(base_meta.get("v_unit", 0)),
+                "base_revision": base_meta.get("revision"),
+                "base_last_updated": base_meta.get("last_updated"),
+            }},
+        )
+        counts[level_v] = table_level.num_rows
+    return counts
+
+
+def get_seconds_root(
+    data_root: str = DATA_ROOT_DEFAULT,
+    allocation_config: Dict | None = None,
+    tick_size: float | None = None,
+    history_modes: Dict | None = None,
+) -> str:
+    """
+    秒级分配层的存储根目录：data_root/seconds_{artifact_config_hash}/，hash 覆盖分配参数、tick_size 与
+    history 的 mapping/normalization 模式，即按内容寻址：同一配置的日结果可直接复用，改参数只需重算新配置下缺失的日。
+    与 v_unit 无关，任意 V 或时间 bar 都从这里切分。其下为 symbol/year/YYYYMMDD.parquet（每日一个文件，一行一秒）。
+    """
+    return os.path.join(data_root, f"seconds_{artifact_config_hash(allocation_config, tick_size, history_modes)}")
+
+
+def _seconds_schema() -> pa.schema:
+    return pa.schema([
+        ("time", pa.timestamp("ns")),
+        ("trade_open", pa.float64()),
+        ("trade_high", pa.float64()),
+        ("trade_low", pa.float64()),
+        ("trade_close", pa.float64()),
+        ("trade_volume", pa.float64()),
+        ("buy_total", pa.float64()),
+        ("sell_total", pa.float64()),
+        ("ticks", pa.list_(pa.int32())),
+        ("buy", pa.list_(pa.float64())),
+        ("sell", pa.list_(pa.float64())),
+    ])
+
+
+def write_second_layer(
+    symbol: object,
+    trade_date: int,
+    times: pd.DatetimeIndex,
+    cols: Dict[str, np.ndarray],
+    alloc: Tuple[np.ndarray, ...],
+    tick_size: float,
+    data_root: str,
+    config: Dict | None = None,
+) -> str:
+    """
+    持久化一日的秒级分配（allocate_day 输出）：一行一秒，价阶为 list 列（tick 为 int32，买卖量保持 float64，
+    切分结果与直接计算逐位一致）。data_root 通常为 get_seconds_root(...)；config（artifact_config）记入文件元数据。
+    返回写入路径。
+    """
+    buy_tot, sell_tot, sec_idx, ticks, buy_c, sell_c = alloc
+    offsets = np.searchsorted(sec_idx, np.arange(len(times) + 1)).astype(np.int32)
+    table = pa.Table.from_arrays(
+        [
+            pa.array(times.values.astype("datetime64[ns]"), type=pa.timestamp("ns")),
+            pa.array(cols["trade_open"], type=pa.float64()),
+            pa.array(cols["trade_high"], type=pa.float64()),
+            pa.array(cols["trade_low"], type=pa.float64()),
+            pa.array(cols["trade_close"], type=pa.float64()),
+            pa.array(cols["trade_volume"], type=pa.float64()),
+            pa.array(buy_tot, type=pa.float64()),
+            pa.array(sell_tot, type=pa.float64()),
+            pa.ListArray.from_arrays(pa.array(offsets), pa.array(ticks, type=pa.int32())),
+            pa.ListArray.from_arrays(pa.array(offsets), pa.array(buy_c, type=pa.float64())),
+            pa.ListArray.from_arrays(pa.array(offsets), pa.array(sell_c, type=pa.float64())),
+        ],
+        schema=_seconds_schema().with_metadata({
+            "tick_size": repr(float(tick_size)),
+            "artifact_config": json.dumps(config if config is not None else artifact_config(tick_size=tick_size), sort_keys=True),
+        }),
+    )
+    path = get_day_file_path(symbol, int(trade_date) // 10000, trade_date, data_root)
+    _ensure_dirs(path)
+    pq.write_table(table, path + ".tmp", compression="snappy")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def read_second_layer(
+    symbol: object,
+    trade_date: int,
+    data_root: str,
+    tick_size: float | None = None,
+) -> Tuple[pd.DatetimeIndex, Dict[str, np.ndarray], Tuple[np.ndarray, ...]] | None:
+    """
+    读取一日的秒级分配层，返回 (times, cols, alloc)，可直接交给 build_v_footprints_from_arrays /
+    build_time_footprints_from_arrays。文件不存在返回 None；tick_size 与写入时不一致则报错。
+    """
+    path = get_day_file_path(symbol, int(trade_date) // 10000, trade_date, data_root)
+    if not os.path.exists(path):
+        return None
+    table = pq.read_table(path).combine_chunks()
+    stored_tick = (table.schema.metadata or {}).get(b"tick_size")
+    if tick_size is not None and stored_tick is not None and float(stored_tick) != float(tick_size):
+        raise ValueError(f"second layer {path} was built with tick_size={float(stored_tick)}, requested {tick_size}")
+
+    def _list(name: str) -> Tuple[np.ndarray, np.ndarray]:
+        arr = table.column(name).chunks[0] if table.num_rows > 0 else None
+        if arr is None:
+            return np.empty(0), np.zeros(1, dtype=np.int64)
+        offsets = arr.offsets.to_numpy().astype(np.int64)
+        return arr.flatten().to_numpy(), offsets - offsets[0]
+
+    ticks, offsets = _list("ticks")
+    times = pd.DatetimeIndex(table.column("time").to_numpy())
+    cols = {c: table.column(c).to_numpy() for c in ("trade_open", "trade_high", "trade_low", "trade_close", "trade_volume")}
+    alloc = (
+        table.column("buy_total").to_numpy(),
+        table.column("sell_total").to_numpy(),
+        np.repeat(np.arange(len(times), dtype=np.int64), np.diff(offsets)),
+        ticks.astype(np.int64),
+        _list("buy")[0],
+        _list("sell")[0],
+    )
+    return times, cols, alloc
+
+
+def list_second_layer_dates(symbol: object, year: int, data_root: str) -> Set[int]:
+    return set(list_day_fragments(symbol, year, data_root))
 
 
 def append_no_data_dates(
@@ -292,22 +961,14 @@ def append_no_data_dates(
 ) -> None:
     """
     将无数据日写入元数据（不改动 Parquet 文件）。
+    bar 计数沿用现有元数据，不再读取年度文件。
     """
-    # Load existing df if exists to pass to write_metadata for bar counts
-    year_path = get_year_file_path(symbol, year, data_root)
-    if os.path.exists(year_path):
-        try:
-            df_existing = pd.read_parquet(year_path, engine="pyarrow")
-        except Exception:
-            df_existing = pd.DataFrame()
-    else:
-        df_existing = pd.DataFrame()
-    write_metadata(
+    update_metadata_days(
         symbol=symbol,
         year=year,
         v_unit=v_unit,
         tick_size=tick_size,
-        df_year=df_existing,
+        bar_count_by_date={},
         data_root=data_root,
         no_data_dates=no_data_dates,
     )
@@ -368,21 +1029,11 @@ def read_day_as_footprint_bars(
 ) -> List[object]:
     """
     读取指定交易日的数据并重构为 FootprintBar 对象列表（使用现有 footprint_bar.FootprintBar）。
-    - 使用年度 Parquet 行（整数 tick、整数成交量、列表列）重建对象字段
+    - 使用年度 Parquet 行或日分片（整数 tick、整数成交量、列表列）重建对象字段，两种布局透明
     - 如未显式提供 tick_size，则从 metadata 读取
     - period 使用 end_time - start_time（每根 V-bar 的覆盖时间）
     """
-    year_path = get_year_file_path(symbol, year, data_root)
-    if not os.path.exists(year_path):
-        return []
-    cols = [
-        "trade_date", "start_time", "end_time",
-        "open_i", "high_i", "low_i", "close_i",
-        "total_volume", "buy_volume", "sell_volume",
-        "prices_i", "vol_buy", "vol_sell",
-    ]
-    df_year = pd.read_parquet(year_path, engine="pyarrow", columns=cols)
-    df_day = df_year[df_year["trade_date"] == int(trade_date)]
+    df_day = _read_year_table(symbol, year, [int(trade_date)], data_root).to_pandas()
     if df_day.empty:
         return []
 
@@ -405,7 +1056,7 @@ def read_range_as_footprint_bars(
 ) -> List[FootprintBar]:
     """
     高效读取一个日期区间内的所有 Footprint 数据，并返回一个 FootprintBar 对象列表。
-    - 按年份分组，每个年份只读一次文件。
+    - 按年份分组，每个年份只读一次文件（日分片布局下只读区间内的分片）。
     - 使用 PyArrow 的 filters 功能在读取时过滤日期，避免加载整个文件。
     - 一次性将所有数据转换为对象。
     """
@@ -421,21 +1072,13 @@ def read_range_as_footprint_bars(
     all_dfs = []
 
     for year, dates_int in dates_by_year.items():
-        year_path = get_year_file_path(symbol, year, data_root)
-        if not os.path.exists(year_path):
-            continue
-        
         try:
-            table = pq.read_table(
-                year_path,
-                filters=[('trade_date', 'in', dates_int)],
-                use_pandas_metadata=True
-            )
+            table = _read_year_table(symbol, year, dates_int, data_root)
             if table.num_rows > 0:
                 all_dfs.append(table.to_pandas())
         except Exception as e:
             # 文件损坏或 filter 失败时可以打印日志
-            print(f"Could not read {year_path} for dates {dates_int}: {e}")
+            print(f"Could not read {get_symbol_dir(symbol, data_root)} year {year} for dates {dates_int}: {e}")
             continue
     
     if not all_dfs:
@@ -1,5 +1,7 @@
 from AlgorithmImports import *
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
 import math
 import numpy as np
 
@@ -187,6 +189,72 @@ def _build_path_points_np(o: float, h: float, l: float, c: float, n_points: int)
         out = np.pad(out, (0, n_points - out.size), mode='edge')
     return out
 
+def _make_path_template(n_points: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Interpolation coefficients of _build_path_points_np for n_points, independent of O/H/L/C.
+
+    Point j is knots[src[j]] + ((knots[dst[j]] - knots[src[j]]) / k[j]) * i[j] with knots = (o, h, l, c).
+    Kept in this gather form rather than as a dense (n x 4) matrix so the arithmetic (and rounding)
+    is exactly that of _build_path_points_np.
+    """
+    n1 = n_points // 3
+    n2 = n_points // 3
+    n3 = n_points - n1 - n2
+    src: List[np.ndarray] = []
+    steps: List[np.ndarray] = []
+    ks: List[np.ndarray] = []
+    for seg, k in enumerate((n1, n2, n3)):
+        if k <= 0:
+            continue
+        src.append(np.full(k, seg, dtype=np.int64))
+        ks.append(np.full(k, float(k)))
+        steps.append(np.arange(1, k + 1, dtype=float))
+    if not src:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.ones(0, dtype=float), np.zeros(0, dtype=float))
+    src_a = np.concatenate(src)
+    return src_a, src_a + 1, np.concatenate(ks), np.concatenate(steps)
+
+
+# n -> (src, dst, k, i); covers every n _compute_micro_count yields with the default n_max,
+# larger n (custom n_max) are added on first use
+_PATH_TEMPLATES: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {
+    n: _make_path_template(n) for n in range(1, 91)
+}
+
+
+def _path_template(n_points: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    tpl = _PATH_TEMPLATES.get(n_points)
+    if tpl is None:
+        tpl = _make_path_template(n_points)
+        _PATH_TEMPLATES[n_points] = tpl
+    return tpl
+
+
+def _path_template_table(counts: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Templates for the given distinct counts stacked into padded (len(counts), width) tables
+    (pad and n = 0: src=dst=0, k=1, i=0). Only the n values actually used get a row, so a large
+    fixed n does not allocate a (n + 1) x n table."""
+    src = np.zeros((counts.size, width), dtype=np.int64)
+    dst = np.zeros((counts.size, width), dtype=np.int64)
+    k = np.ones((counts.size, width), dtype=float)
+    i = np.zeros((counts.size, width), dtype=float)
+    for row, n in enumerate(counts.tolist()):
+        if n <= 0:
+            continue
+        t_src, t_dst, t_k, t_i = _path_template(n)
+        src[row, :n] = t_src
+        dst[row, :n] = t_dst
+        k[row, :n] = t_k
+        i[row, :n] = t_i
+    return src, dst, k, i
+
+
+def _build_paths_tpl(n_points: int, knots: np.ndarray) -> np.ndarray:
+    """Build several paths at once from a (paths x 4) O/H/L/C knot array; same values as _build_path_points_np."""
+    src, dst, k, i = _path_template(n_points)
+    start = knots[:, src]
+    return start + ((knots[:, dst] - start) / k) * i
+
 # def micro_allocate_volume(
 #     tradebar: TradeBar,
 #     quotebar: QuoteBar,
@@ -290,7 +358,7 @@ def _build_path_points_np(o: float, h: float, l: float, c: float, n_points: int)
 
 #     return buy_total, sell_total, bucket_deltas
 
-def micro_allocate_volume_raw(
+def micro_allocate_into(
     t_o: float, t_h: float, t_l: float, t_c: float, volume: float,
     b_o: float, b_h: float, b_l: float, b_c: float,
     a_o: float, a_h: float, a_l: float, a_c: float,
@@ -298,19 +366,89 @@ def micro_allocate_volume_raw(
     alpha: float = 1.0,
     n_min: int = 9,
     n_max: int = 90,
-) -> Tuple[float, float, Dict[float, Dict[str, float]]]:
-    """Same logic as micro_allocate_volume but using raw OHLC scalars to avoid object creation overhead."""
+    into: Optional["TickLadderAccumulator"] = None,
+) -> Tuple[float, float, np.ndarray, np.ndarray, np.ndarray]:
+    """Array/int-tick form of micro_allocate_volume_raw.
+
+    Returns (buy_total, sell_total, ticks, buy, sell) with int64 ticks = round(price / tick_size) sorted
+    ascending and float per-tick volumes; no float price keys are built. If `into` is given the ladder
+    is also added to that accumulator. A non-positive tick_size uses unit ticks (round(price)).
+    """
+    empty_i = np.empty(0, dtype=np.int64)
+    empty_f = np.empty(0, dtype=float)
     if volume is None or volume <= 0:
-        return 0.0, 0.0, {}
+        return 0.0, 0.0, empty_i, empty_f, empty_f
 
     n = _compute_micro_count(volume, alpha=alpha, n_min=n_min, n_max=n_max)
     if n <= 0:
-        return 0.0, 0.0, {}
+        return 0.0, 0.0, empty_i, empty_f, empty_f
+
+    paths = _build_paths_tpl(n, np.array([
+        [t_o, t_h, t_l, t_c],
+        [b_o, b_h, b_l, b_c],
+        [a_o, a_h, a_l, a_c],
+    ], dtype=float))
+    buy_inc, sell_inc = _split_micro_volume(paths[0], paths[1], paths[2], volume, n)
+
+    unit = tick_size if tick_size and tick_size > 0 else 1.0
+    ticks, inv = np.unique(np.rint(paths[0] / unit).astype(np.int64), return_inverse=True)
+    inv = inv.reshape(-1)
+    # bincount accumulates in path order, same sums as np.add.at
+    buy = np.bincount(inv, weights=buy_inc, minlength=ticks.size)
+    sell = np.bincount(inv, weights=sell_inc, minlength=ticks.size)
+    if into is not None:
+        into.add(ticks, buy, sell)
+    return float(buy_inc.sum()), float(sell_inc.sum()), ticks, buy, sell
+
+
+def micro_allocate_volume_raw(
+    t_o: float, t_h: float, t_l: float, t_c: float, volume: float,
+    b_o: float, b_h: float, b_l: float, b_c: float,
+    a_o: float, a_h: float, a_l: float, a_c: float,
+    tick_size: float,
+    alpha: float = 1.0,
+    n_min: int = 9,
+    n_max: int = 90,
+) -> Tuple[float, float, Dict[float, Dict[str, float]]]:
+    """Same logic as micro_allocate_volume but using raw OHLC scalars to avoid object creation overhead.
 
-    price_path = _build_path_points_np(t_o, t_h, t_l, t_c, n)
-    bid_path = _build_path_points_np(b_o, b_h, b_l, b_c, n)
-    ask_path = _build_path_points_np(a_o, a_h, a_l, a_c, n)
+    Compatibility wrapper returning {price: {"ask": buy, "bid": sell}}; new code should use
+    micro_allocate_into (int ticks, arrays).
+    """
+    if not (tick_size and tick_size > 0):
+        # exact float price buckets when no tick grid is given
+        if volume is None or volume <= 0:
+            return 0.0, 0.0, {}
+        n = _compute_micro_count(volume, alpha=alpha, n_min=n_min, n_max=n_max)
+        if n <= 0:
+            return 0.0, 0.0, {}
+        paths = _build_paths_tpl(n, np.array([
+            [t_o, t_h, t_l, t_c],
+            [b_o, b_h, b_l, b_c],
+            [a_o, a_h, a_l, a_c],
+        ], dtype=float))
+        return _micro_allocate_paths(paths[0], paths[1], paths[2], volume, n, tick_size)
 
+    buy_total, sell_total, ticks, buy, sell = micro_allocate_into(
+        t_o, t_h, t_l, t_c, volume,
+        b_o, b_h, b_l, b_c,
+        a_o, a_h, a_l, a_c,
+        tick_size=tick_size, alpha=alpha, n_min=n_min, n_max=n_max,
+    )
+    bucket_deltas: Dict[float, Dict[str, float]] = {}
+    for t, b, s in zip(ticks.tolist(), buy.tolist(), sell.tolist()):
+        bucket_deltas[float(t * tick_size)] = {"ask": b, "bid": s}
+    return buy_total, sell_total, bucket_deltas
+
+
+def _split_micro_volume(
+    price_path: np.ndarray,
+    bid_path: np.ndarray,
+    ask_path: np.ndarray,
+    volume: float,
+    n: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per micro-trade (buy, sell) volumes from the spread position of the price path."""
     micro_v = volume / float(n)
     spread = ask_path - bid_path
 
@@ -336,7 +474,19 @@ def micro_allocate_volume_raw(
         frac = np.clip(frac, 0.0, 1.0)
         buy_inc[in_spread] = micro_v * frac
         sell_inc[in_spread] = micro_v - buy_inc[in_spread]
+    return buy_inc, sell_inc
 
+
+def _micro_allocate_paths(
+    price_path: np.ndarray,
+    bid_path: np.ndarray,
+    ask_path: np.ndarray,
+    volume: float,
+    n: int,
+    tick_size: float,
+) -> Tuple[float, float, Dict[float, Dict[str, float]]]:
+    """Dict-returning buy/sell split and bucketing of one second's micro paths (reference form)."""
+    buy_inc, sell_inc = _split_micro_volume(price_path, bid_path, ask_path, volume, n)
     buy_total = float(buy_inc.sum())
     sell_total = float(sell_inc.sum())
 
@@ -360,4 +510,545 @@ def micro_allocate_volume_raw(
         for i, up in enumerate(uniq):
             bucket_deltas[float(up)] = {"ask": float(ask_sums[i]), "bid": float(bid_sums[i])}
 
-    return buy_total, sell_total, bucket_deltas
\ No newline at end of file
+    return buy_total, sell_total, bucket_deltas
+
+
+def _pairwise_sum_fixed(mat: np.ndarray) -> np.ndarray:
+    """Row sums of a (rows, n) matrix reproducing numpy's pairwise summation for length-n vectors.
+
+    ndarray.sum() on a contiguous float64 vector uses pairwise summation (8 partial accumulators for
+    blocks up to 128, recursive halving above). Reproducing it column-wise keeps batch totals
+    bit-for-bit identical to float(buy_inc.sum()) in the scalar path.
+    """
+    rows, n = mat.shape
+    if n < 8:
+        res = np.zeros(rows, dtype=float)
+        for j in range(n):
+            res += mat[:, j]
+        return res
+    if n <= 128:
+        r = mat[:, 0:8].copy()
+        i = 8
+        stop = n - (n % 8)
+        while i < stop:
+            r += mat[:, i:i + 8]
+            i += 8
+        res = ((r[:, 0] + r[:, 1]) + (r[:, 2] + r[:, 3])) + ((r[:, 4] + r[:, 5]) + (r[:, 6] + r[:, 7]))
+        while i < n:
+            res += mat[:, i]
+            i += 1
+        return res
+    n2 = n // 2
+    n2 -= n2 % 8
+    return _pairwise_sum_fixed(mat[:, :n2]) + _pairwise_sum_fixed(mat[:, n2:])
+
+
+def _pairwise_sum_rows(mat: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Sum the first lengths[r] entries of every row of a padded matrix, numpy-pairwise exact."""
+    out = np.zeros(mat.shape[0], dtype=float)
+    for n in np.unique(lengths):
+        if n <= 0:
+            continue
+        rows = np.flatnonzero(lengths == n)
+        out[rows] = _pairwise_sum_fixed(mat[rows, :n])
+    return out
+
+
+def micro_allocate_batch(
+    t_o: np.ndarray, t_h: np.ndarray, t_l: np.ndarray, t_c: np.ndarray, volume: np.ndarray,
+    b_o: np.ndarray, b_h: np.ndarray, b_l: np.ndarray, b_c: np.ndarray,
+    a_o: np.ndarray, a_h: np.ndarray, a_l: np.ndarray, a_c: np.ndarray,
+    tick_size: float,
+    alpha: float = 1.0,
+    n_min: int = 9,
+    n_max: int = 90,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Whole-day vectorized micro_allocate_volume_raw over per-second column arrays.
+
+    All micro paths are built at once in a padded (seconds x n) matrix, so there is no per-second
+    Python call. Results are bit-for-bit identical to calling micro_allocate_volume_raw row by row
+    (per-bucket sums are accumulated in path order, totals use the same pairwise summation).
+
+    Returns (buy_total[S], sell_total[S], sec_idx[K], ticks[K], buy[K], sell[K]): per-second totals,
+    and the per-tick contributions sorted by second then tick (ticks are int64 round(price / tick_size)).
+    A non-positive tick_size falls back to unit ticks (round(price)), like _to_tick_int.
+    """
+    vol = np.asarray(volume, dtype=float)
+    n_sec = vol.size
+    empty_i = np.empty(0, dtype=np.int64)
+    empty_f = np.empty(0, dtype=float)
+    buy_total = np.zeros(n_sec, dtype=float)
+    sell_total = np.zeros(n_sec, dtype=float)
+    if n_sec == 0:
+        return buy_total, sell_total, empty_i, empty_i, empty_f, empty_f
+
+    # _compute_micro_count, vectorized: int() truncation then clamp to [n_min, n_max]
+    active = vol > 0
+    n = np.zeros(n_sec, dtype=np.int64)
+    n[active] = np.clip(np.floor(np.minimum(alpha * vol[active], float(n_max))), n_min, n_max).astype(np.int64)
+    n[n < 0] = 0
+    width = int(n.max())
+    if width <= 0:
+        return buy_total, sell_total, empty_i, empty_i, empty_f, empty_f
+
+    # per-row interpolation coefficients from a template table over the distinct n
+    counts, row_of = np.unique(n, return_inverse=True)
+    tbl_src, tbl_dst, tbl_k, tbl_i = _path_template_table(counts, width)
+    row_of = row_of.reshape(-1)
+    col = np.arange(width, dtype=np.int64)[None, :]
+    valid = col < n[:, None]
+    seg_src = tbl_src[row_of]
+    seg_dst = tbl_dst[row_of]
+    seg_k = tbl_k[row_of]
+    seg_i = tbl_i[row_of]
+
+    def _path(o, h, l, c) -> np.ndarray:
+        knots = np.stack([np.asarray(o, dtype=float), np.asarray(h, dtype=float),
+                          np.asarray(l, dtype=float), np.asarray(c, dtype=float)], axis=1)
+        start = np.take_along_axis(knots, seg_src, axis=1)
+        end = np.take_along_axis(knots, seg_dst, axis=1)
+        return start + ((end - start) / seg_k) * seg_i
+
+    price_path = _path(t_o, t_h, t_l, t_c)
+    bid_path = _path(b_o, b_h, b_l, b_c)
+    ask_path = _path(a_o, a_h, a_l, a_c)
+
+    micro_v = np.zeros(n_sec, dtype=float)
+    micro_v[n > 0] = vol[n > 0] / n[n > 0].astype(float)
+    micro_v = np.broadcast_to(micro_v[:, None], price_path.shape)
+    spread = ask_path - bid_path
+
+    nonpos_spread = spread <= 0
+    in_spread = ~nonpos_spread & (price_path > bid_path) & (price_path < ask_path)
+    at_or_above = ~nonpos_spread & (price_path >= ask_path)
+
+    frac = np.divide(price_path - bid_path, spread, out=np.zeros_like(spread), where=in_spread)
+    buy_inc = np.where(
+        nonpos_spread, 0.5 * micro_v,
+        np.where(at_or_above, micro_v, np.where(in_spread, micro_v * np.clip(frac, 0.0, 1.0), 0.0)),
+    )
+    sell_inc = micro_v - buy_inc
+    buy_inc[~valid] = 0.0
+    sell_inc[~valid] = 0.0
+
+    buy_total = _pairwise_sum_rows(buy_inc, n)
+    sell_total = _pairwise_sum_rows(sell_inc, n)
+
+    # per (second, tick) sums; bincount accumulates in row-major (= path) order like np.add.at
+    unit = tick_size if tick_size and tick_size > 0 else 1.0
+    ticks_mat = np.rint(price_path / unit)
+    ticks_mat[~valid] = 0.0
+    ticks_mat = ticks_mat.astype(np.int64)
+    row_min = np.where(valid, ticks_mat, np.iinfo(np.int64).max).min(axis=1)
+    row_min[n == 0] = 0
+    span = int(np.where(valid, ticks_mat - row_min[:, None], 0).max()) + 1
+    rows_flat = np.nonzero(valid)[0]
+    key = rows_flat * span + (ticks_mat[valid] - row_min[rows_flat])
+    uniq, inv = np.unique(key, return_inverse=True)
+    inv = inv.reshape(-1)
+    buy = np.bincount(inv, weights=buy_inc[valid], minlength=uniq.size)
+    sell = np.bincount(inv, weights=sell_inc[valid], minlength=uniq.size)
+    sec_idx = uniq // span
+    ticks = uniq - sec_idx * span + row_min[sec_idx]
+    return buy_total, sell_total, sec_idx, ticks, buy, sell
+
+
+def _segment_buy_integral(
+    u1: np.ndarray, u2: np.ndarray,
+    d1: np.ndarray, dd: np.ndarray,
+    s1: np.ndarray, ds: np.ndarray,
+) -> np.ndarray:
+    """Exact integral of (price - bid) / (ask - bid) over [u1, u2] for linear numerator/denominator.
+
+    d1/s1 are numerator/denominator at u1, dd/ds their slopes in u; the spread must stay positive on
+    the interval. Near-constant spreads use the midpoint rule (relative error ~ (ds*du/s1)^2).
+    """
+    du = u2 - u1
+    s2 = s1 + ds * du
+    with np.errstate(divide="ignore", invalid="ignore"):
+        flat = np.abs(ds * du) <= 1e-6 * s1
+        # d/s = dd/ds + (d1*ds - dd*s1) / (ds * s); when the spread closes at an end point inside the
+        # spread regime the constant term is 0 (d vanishes with s), so only the linear part remains
+        log_term = (d1 - dd * s1 / ds) / ds * np.log1p(ds * du / s1)
+        log_term = np.where((s1 > 0) & (s2 > 0), log_term, 0.0)
+        curved = dd / ds * du + log_term
+        mid = du * (d1 + 0.5 * dd * du) / (s1 + 0.5 * ds * du)
+    out = np.where(flat, mid, curved)
+    return np.clip(out, 0.0, du)
+
+
+def _analytic_segments(
+    q0: np.ndarray, q1: np.ndarray,
+    b0: np.ndarray, b1: np.ndarray,
+    a0: np.ndarray, a1: np.ndarray,
+    p0: np.ndarray, p1: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Split linear segments (u in [0, 1]) at tick-bucket and bid/ask crossings.
+
+    q0/q1 are the price end points in tick units, p0/p1/b0/b1/a0/a1 in price units.
+    Returns (row, bucket, time_share, buy_share) for every non-empty piece.
+    """
+    m = q0.size
+    lo = np.minimum(np.rint(q0), np.rint(q1))
+    n_cross = (np.maximum(np.rint(q0), np.rint(q1)) - lo).astype(np.int64)
+    width = int(n_cross.max()) if m > 0 else 0
+
+    dq = q1 - q0
+    d_0 = p0 - b0
+    d_s = (p1 - b1) - d_0
+    e_0 = a0 - p0
+    e_s = (a1 - p1) - e_0
+    s_0 = a0 - b0
+    s_s = (a1 - b1) - s_0
+
+    def _root(c0: np.ndarray, cs: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = -c0 / cs
+        return np.where((cs != 0) & (r > 0) & (r < 1), r, 0.0)
+
+    knots = np.empty((m, width + 5), dtype=float)
+    knots[:, 0] = 0.0
+    knots[:, 1] = 1.0
+    knots[:, 2] = _root(d_0, d_s)
+    knots[:, 3] = _root(e_0, e_s)
+    knots[:, 4] = _root(s_0, s_s)
+    if width > 0:
+        j = np.arange(width, dtype=float)[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = (lo[:, None] + 0.5 + j - q0[:, None]) / dq[:, None]
+        inside = (j < n_cross[:, None]) & (u > 0) & (u < 1)
+        knots[:, 5:] = np.where(inside, u, 0.0)
+    knots.sort(axis=1)
+
+    u1 = knots[:, :-1]
+    u2 = knots[:, 1:]
+    keep = u2 > u1
+    row = np.broadcast_to(np.arange(m, dtype=np.int64)[:, None], u1.shape)[keep]
+    u1 = u1[keep]
+    u2 = u2[keep]
+    um = 0.5 * (u1 + u2)
+
+    bucket = np.rint(q0[row] + dq[row] * um).astype(np.int64)
+    d_mid = d_0[row] + d_s[row] * um
+    e_mid = e_0[row] + e_s[row] * um
+    s_mid = s_0[row] + s_s[row] * um
+    du = u2 - u1
+
+    nonpos_spread = s_mid <= 0
+    at_or_above = ~nonpos_spread & (e_mid <= 0)
+    in_spread = ~nonpos_spread & (d_mid > 0) & (e_mid > 0)
+    buy = np.zeros_like(du)
+    buy[nonpos_spread] = 0.5 * du[nonpos_spread]
+    buy[at_or_above] = du[at_or_above]
+    if np.any(in_spread):
+        r = row[in_spread]
+        a = u1[in_spread]
+        buy[in_spread] = _segment_buy_integral(
+            a, u2[in_spread],
+            d_0[r] + d_s[r] * a, d_s[r],
+            s_0[r] + s_s[r] * a, s_s[r],
+        )
+    return row, bucket, du, buy
+
+
+def micro_allocate_batch_analytic(
+    t_o: np.ndarray, t_h: np.ndarray, t_l: np.ndarray, t_c: np.ndarray, volume: np.ndarray,
+    b_o: np.ndarray, b_h: np.ndarray, b_l: np.ndarray, b_c: np.ndarray,
+    a_o: np.ndarray, a_h: np.ndarray, a_l: np.ndarray, a_c: np.ndarray,
+    tick_size: float,
+    chunk_rows: int = 16384,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Closed-form counterpart of micro_allocate_batch (the n -> infinity limit of the sampled path).
+
+    Each second's volume is spread uniformly in time along O->H->L->C (one third per leg, as the
+    sampled path does for large n). Every leg is cut where the price crosses a tick-bucket boundary
+    or the bid/ask/spread changes regime; on each piece the time share is exact and the buy share
+    integrates (price - bid) / spread in closed form. Cost depends on ticks crossed, not on n_max.
+
+    Returns the same (buy_total, sell_total, sec_idx, ticks, buy, sell) layout as micro_allocate_batch.
+    """
+    vol = np.asarray(volume, dtype=float)
+    n_sec = vol.size
+    buy_total = np.zeros(n_sec, dtype=float)
+    sell_total = np.zeros(n_sec, dtype=float)
+    empty_i = np.empty(0, dtype=np.int64)
+    empty_f = np.empty(0, dtype=float)
+    active = np.flatnonzero(vol > 0)
+    if active.size == 0:
+        return buy_total, sell_total, empty_i, empty_i, empty_f, empty_f
+    unit = tick_size if tick_size and tick_size > 0 else 1.0
+
+    def _legs(o, h, l, c) -> Tuple[np.ndarray, np.ndarray]:
+        o, h, l, c = (np.asarray(x, dtype=float)[active] for x in (o, h, l, c))
+        return np.concatenate([o, h, l]), np.concatenate([h, l, c])
+
+    p0, p1 = _legs(t_o, t_h, t_l, t_c)
+    b0, b1 = _legs(b_o, b_h, b_l, b_c)
+    a0, a1 = _legs(a_o, a_h, a_l, a_c)
+    leg_sec = np.tile(active, 3)
+    leg_vol = np.tile(vol[active] / 3.0, 3)
+
+    secs, buckets, vols, buys = [], [], [], []
+    # chunk so one wide-ranging second cannot blow up the (legs x crossings) matrix for the whole day
+    order = np.argsort(np.abs(np.rint(p1 / unit) - np.rint(p0 / unit)), kind="stable")
+    for i in range(0, order.size, chunk_rows):
+        idx = order[i:i + chunk_rows]
+        row, bucket, du, bu = _analytic_segments(
+            p0[idx] / unit, p1[idx] / unit, b0[idx], b1[idx], a0[idx], a1[idx], p0[idx], p1[idx],
+        )
+        w = leg_vol[idx][row]
+        secs.append(leg_sec[idx][row])
+        buckets.append(bucket)
+        vols.append(w * du)
+        buys.append(w * bu)
+    sec_all = np.concatenate(secs)
+    tick_all = np.concatenate(buckets)
+    vol_all = np.concatenate(vols)
+    buy_all = np.concatenate(buys)
+    sell_all = vol_all - buy_all
+
+    buy_total = np.bincount(sec_all, weights=buy_all, minlength=n_sec)
+    sell_total = np.bincount(sec_all, weights=sell_all, minlength=n_sec)
+
+    lo = int(tick_all.min())
+    span = int(tick_all.max()) - lo + 1
+    uniq, inv = np.unique(sec_all * span + (tick_all - lo), return_inverse=True)
+    inv = inv.reshape(-1)
+    buy = np.bincount(inv, weights=buy_all, minlength=uniq.size)
+    sell = np.bincount(inv, weights=sell_all, minlength=uniq.size)
+    sec_idx = uniq // span
+    ticks = uniq - sec_idx * span + lo
+    return buy_total, sell_total, sec_idx, ticks, buy, sell
+
+
+def micro_allocate_volume_analytic(
+    t_o: float, t_h: float, t_l: float, t_c: float, volume: float,
+    b_o: float, b_h: float, b_l: float, b_c: float,
+    a_o: float, a_h: float, a_l: float, a_c: float,
+    tick_size: float,
+) -> Tuple[float, float, Dict[float, Dict[str, float]]]:
+    """Single-second analytic allocation with the same return shape as micro_allocate_volume_raw."""
+    if volume is None or volume <= 0:
+        return 0.0, 0.0, {}
+    args = [np.array([float(x)]) for x in (t_o, t_h, t_l, t_c, volume, b_o, b_h, b_l, b_c, a_o, a_h, a_l, a_c)]
+    buy_total, sell_total, _, ticks, buy, sell = micro_allocate_batch_analytic(*args, tick_size=tick_size)
+    unit = tick_size if tick_size and tick_size > 0 else 1.0
+    bucket_deltas: Dict[float, Dict[str, float]] = {}
+    for t, b, s in zip(ticks.tolist(), buy.tolist(), sell.tolist()):
+        bucket_deltas[float(t * unit)] = {"ask": b, "bid": s}
+    return float(buy_total[0]), float(sell_total[0]), bucket_deltas
+
+
+ALLOCATION_MODES = ("sampled", "analytic")
+
+DEFAULT_ALLOCATION_CONFIG: Dict[str, object] = {"mode": "sampled", "alpha": 1.0, "n_min": 9, "n_max": 90}
+
+
+def normalize_allocation_config(config: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """Fill defaults and drop parameters the chosen mode ignores (analytic has no alpha/n_min/n_max)."""
+    cfg = dict(DEFAULT_ALLOCATION_CONFIG)
+    cfg.update(config or {})
+    if cfg["mode"] not in ALLOCATION_MODES:
+        raise ValueError(f"unknown allocation mode: {cfg['mode']} (expected one of {ALLOCATION_MODES})")
+    if cfg["mode"] == "analytic":
+        return {"mode": "analytic"}
+    return {"mode": "sampled", "alpha": float(cfg["alpha"]), "n_min": int(cfg["n_min"]), "n_max": int(cfg["n_max"])}
+
+
+def allocation_config_hash(config: Optional[Dict[str, object]] = None) -> str:
+    """Short stable hash of the normalized allocation config (used to namespace stores)."""
+    payload = json.dumps(normalize_allocation_config(config), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+# History request modes that change the per-second input (names of LEAN's DataMappingMode / DataNormalizationMode)
+DEFAULT_HISTORY_MODES: Dict[str, str] = {"data_mapping_mode": "OPEN_INTEREST_ANNUAL", "data_normalization_mode": "RAW"}
+
+
+def artifact_config(
+    allocation_config: Optional[Dict[str, object]] = None,
+    tick_size: Optional[float] = None,
+    history_modes: Optional[Dict[str, str]] = None,
+) -> Dict[str, object]:
+    """Everything besides (symbol, day) that determines a day's allocation: allocator, tick size, history modes."""
+    modes = dict(DEFAULT_HISTORY_MODES)
+    modes.update(history_modes or {})
+    return {
+        "allocation": normalize_allocation_config(allocation_config),
+        "tick_size": None if tick_size is None else float(tick_size),
+        "data_mapping_mode": str(modes["data_mapping_mode"]),
+        "data_normalization_mode": str(modes["data_normalization_mode"]),
+    }
+
+
+def artifact_config_hash(
+    allocation_config: Optional[Dict[str, object]] = None,
+    tick_size: Optional[float] = None,
+    history_modes: Optional[Dict[str, str]] = None,
+) -> str:
+    """Short stable hash of artifact_config; keys the per-second cache and is recorded per date in store metadata."""
+    payload = json.dumps(artifact_config(allocation_config, tick_size, history_modes), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def allocate_day(
+    cols: Dict[str, np.ndarray],
+    tick_size: float,
+    mode: str = "sampled",
+    alpha: float = 1.0,
+    n_min: int = 9,
+    n_max: int = 90,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Dispatch a day's per-second columns (internal names of HISTORY_DF_FIELD_MAP) to an allocator.
+
+    alpha / n_min / n_max only apply to "sampled"; allocate_day(cols, tick_size, **normalize_allocation_config(cfg))
+    runs a stored config.
+    """
+    args = (
+        cols["trade_open"], cols["trade_high"], cols["trade_low"], cols["trade_close"], cols["trade_volume"],
+        cols["bid_open"], cols["bid_high"], cols["bid_low"], cols["bid_close"],
+        cols["ask_open"], cols["ask_high"], cols["ask_low"], cols["ask_close"],
+    )
+    if mode == "sampled":
+        return micro_allocate_batch(*args, tick_size=tick_size, alpha=alpha, n_min=n_min, n_max=n_max)
+    if mode == "analytic":
+        return micro_allocate_batch_analytic(*args, tick_size=tick_size)
+    raise ValueError(f"unknown allocation mode: {mode} (expected one of {ALLOCATION_MODES})")
+
+
+def allocation_error_report(
+    cols: Dict[str, np.ndarray],
+    tick_size: float,
+    n_values: Tuple[int, ...] = (9, 30, 90, 300, 900, 3000),
+    chunk_cells: int = 1 << 20,
+) -> List[Dict[str, float]]:
+    """Compare the sampled allocator at fixed n (n_min = n_max = n) against the analytic one.
+
+    For each n reports, over all active seconds, the volume-weighted L1 distance of the per-tick
+    buy/sell ladders (as a fraction of volume) and the relative error of the buy total.
+    The sampled errors shrink as n grows, i.e. sampled converges to analytic.
+    Seconds are processed in chunks of about chunk_cells / n rows, so the padded (seconds x n)
+    matrices of micro_allocate_batch stay bounded for large n and full-day inputs.
+    """
+    args = (
+        cols["trade_open"], cols["trade_high"], cols["trade_low"], cols["trade_close"], cols["trade_volume"],
+        cols["bid_open"], cols["bid_high"], cols["bid_low"], cols["bid_close"],
+        cols["ask_open"], cols["ask_high"], cols["ask_low"], cols["ask_close"],
+    )
+    vol = np.asarray(cols["trade_volume"], dtype=float)
+    total = float(vol[vol > 0].sum())
+    ref_bt, _, ref_sec, ref_tick, ref_buy, ref_sell = micro_allocate_batch_analytic(*args, tick_size=tick_size)
+    report: List[Dict[str, float]] = []
+    if total <= 0:
+        return report
+    for n in n_values:
+        rows = max(1, int(chunk_cells) // max(int(n), 1))
+        l1 = 0.0
+        buy_err = 0.0
+        for start in range(0, vol.size, rows):
+            stop = min(start + rows, vol.size)
+            bt, _, sec, tick, buy, sell = micro_allocate_batch(
+                *(np.asarray(a)[start:stop] for a in args), tick_size=tick_size, n_min=n, n_max=n,
+            )
+            buy_err += float(np.abs(bt - ref_bt[start:stop]).sum())
+            # analytic contributions are sorted by second: slice this chunk's rows
+            lo_r, hi_r = np.searchsorted(ref_sec, [start, stop])
+            c_sec = ref_sec[lo_r:hi_r] - start
+            c_tick = ref_tick[lo_r:hi_r]
+            keys = np.concatenate([c_sec, sec]), np.concatenate([c_tick, tick])
+            if keys[0].size == 0:
+                continue
+            lo = int(keys[1].min())
+            span = int(keys[1].max()) - lo + 1
+            uniq, inv = np.unique(keys[0] * span + (keys[1] - lo), return_inverse=True)
+            inv = inv.reshape(-1)
+            k = c_sec.size
+            diff_buy = np.bincount(inv[:k], ref_buy[lo_r:hi_r], uniq.size) - np.bincount(inv[k:], buy, uniq.size)
+            diff_sell = np.bincount(inv[:k], ref_sell[lo_r:hi_r], uniq.size) - np.bincount(inv[k:], sell, uniq.size)
+            l1 += float(np.abs(diff_buy).sum() + np.abs(diff_sell).sum())
+        report.append({
+            "n": float(n),
+            "ladder_l1": float(l1 / total),
+            "buy_total_rel": float(buy_err / total),
+        })
+    return report
+
+
+class TickLadderAccumulator:
+    """Dense per-tick buy/sell accumulator indexed by tick - base_tick, grown when a tick falls outside.
+
+    Replaces the {tick: [buy, sell]} dict on the per-second hot path: add() is one np.add.at per side,
+    finalize() returns the touched levels sorted by tick with all-zero levels dropped.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.base_tick = 0
+        self.buy = np.zeros(capacity, dtype=float)
+        self.sell = np.zeros(capacity, dtype=float)
+        self._lo = 0
+        self._hi = -1  # empty: hi < lo (offsets relative to base_tick)
+
+    def _grow(self, lo_tick: int, hi_tick: int) -> None:
+        if self._hi < self._lo:
+            # empty accumulator: re-center without copying
+            need = hi_tick - lo_tick + 1
+            if need > self.buy.size:
+                size = max(2 * self.buy.size, need)
+                self.buy = np.zeros(size, dtype=float)
+                self.sell = np.zeros(size, dtype=float)
+            self.base_tick = lo_tick - (self.buy.size - need) // 2
+            return
+        used_lo = self.base_tick + self._lo
+        used_hi = self.base_tick + self._hi
+        new_lo = min(lo_tick, used_lo)
+        new_hi = max(hi_tick, used_hi)
+        need = new_hi - new_lo + 1
+        size = max(2 * self.buy.size, need)
+        new_base = new_lo - (size - need) // 2
+        buy = np.zeros(size, dtype=float)
+        sell = np.zeros(size, dtype=float)
+        shift = self.base_tick - new_base
+        buy[self._lo + shift:self._hi + shift + 1] = self.buy[self._lo:self._hi + 1]
+        sell[self._lo + shift:self._hi + shift + 1] = self.sell[self._lo:self._hi + 1]
+        self.buy, self.sell = buy, sell
+        self._lo += shift
+        self._hi += shift
+        self.base_tick = new_base
+
+    def add(self, ticks: np.ndarray, buy: np.ndarray, sell: np.ndarray) -> None:
+        """Add contributions at integer ticks (duplicates allowed, accumulated in order)."""
+        if ticks.size == 0:
+            return
+        lo_tick = int(ticks.min())
+        hi_tick = int(ticks.max())
+        if (self._hi < self._lo or lo_tick < self.base_tick
+                or hi_tick >= self.base_tick + self.buy.size):
+            self._grow(lo_tick, hi_tick)
+        offs = ticks - self.base_tick
+        np.add.at(self.buy, offs, buy)
+        np.add.at(self.sell, offs, sell)
+        if self._hi < self._lo:
+            self._lo = lo_tick - self.base_tick
+            self._hi = hi_tick - self.base_tick
+        else:
+            self._lo = min(self._lo, lo_tick - self.base_tick)
+            self._hi = max(self._hi, hi_tick - self.base_tick)
+
+    def is_empty(self) -> bool:
+        return self._hi < self._lo
+
+    def finalize(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (ticks int64, buy float, sell float) of the non-zero levels, sorted by tick."""
+        if self._hi < self._lo:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=float), np.empty(0, dtype=float)
+        buy = self.buy[self._lo:self._hi + 1]
+        sell = self.sell[self._lo:self._hi + 1]
+        keep = np.flatnonzero((buy != 0.0) | (sell != 0.0))
+        return keep + (self.base_tick + self._lo), buy[keep].copy(), sell[keep].copy()
+
+    def clear(self) -> None:
+        if self._hi >= self._lo:
+            self.buy[self._lo:self._hi + 1] = 0.0
+            self.sell[self._lo:self._hi + 1] = 0.0
+        self._lo = 0
+        self._hi = -1
@@ -1,12 +1,38 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Tuple
+from typing import Callable, Deque, Dict, Iterator, List, Tuple
 from AlgorithmImports import *
 
+import multiprocessing
+import queue
+import threading
+import time
+import numpy as np
 import pandas as pd
 
-from footprint_aggregator import build_v_footprints
+from footprint_aggregator import build_v_footprints_from_arrays, prepare_second_arrays
+from footprint_batch import FootprintBatch
+from footprint_calendar import session_window, trading_days
+from footprint_utils import (
+    DEFAULT_HISTORY_MODES,
+    allocate_day,
+    artifact_config,
+    artifact_config_hash,
+    normalize_allocation_config,
+)
 from footprint_storage import (
     append_days,
+    append_no_data_dates,
+    append_progress_journal,
+    committed_dates_from_journal,
+    build_pyramid_levels,
+    get_store_root,
+    get_seconds_root,
+    read_second_layer,
+    write_second_layer,
+    write_store_manifest,
     detect_missing_dates,
     get_year_file_path,
     read_present_dates,
@@ -61,6 +87,48 @@ def _normalize_history_df(df_history: pd.DataFrame, sym) -> pd.DataFrame:
     return df
 
 
+def _symbol_key(symbol: object) -> str:
+    # 可 pickle 的 symbol 表示（与存储路径所用字符串一致），供子进程写秒级层
+    return str(getattr(symbol, "value", symbol))
+
+
+def _build_day_batch(
+    times: pd.DatetimeIndex,
+    cols: Dict[str, np.ndarray],
+    v_unit: int,
+    tick_size: float,
+    allocation_config: Dict,
+    seconds_target: Tuple[str, int, str, Dict] | None = None,
+    trade_date: int | None = None,
+) -> FootprintBatch:
+    """
+    单日计算：秒级分配 + V 切分（可选写秒级层）。workers>1 时在子进程中执行，参数与返回值均为可 pickle 的
+    数组 / FootprintBatch，结果与串行路径逐位一致。trade_date 为该日所属交易日（见 build_v_footprints_from_arrays）。
+    """
+    alloc = allocate_day(cols, tick_size=tick_size, **allocation_config)
+    if seconds_target is not None:
+        symbol_key, td, seconds_root, config = seconds_target
+        write_second_layer(symbol_key, td, times, cols, alloc, tick_size, seconds_root, config=config)
+    return build_v_footprints_from_arrays(times, cols, alloc, v_unit, tick_size, output="batch", trade_date=trade_date)
+
+
+def _worker_ready() -> bool:
+    return True
+
+
+def _start_worker_pool(workers: int) -> ProcessPoolExecutor | None:
+    """
+    创建计算进程池（fork）并在主线程上立即启动全部子进程：fork 上下文的 ProcessPoolExecutor 在首次 submit 时
+    一次性 fork 出所有 worker，这里用一个空任务触发并等待，保证 fork 发生在取数 / 计算 / 写入线程启动之前，
+    子进程不会继承其他线程持有的锁。子进程只做 numpy / pyarrow 计算，不调用 qb / CLR。workers<=1 返回 None。
+    """
+    if workers <= 1:
+        return None
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    pool.submit(_worker_ready).result()
+    return pool
+
+
 def run(
     qb,
     symbol: object,
@@ -71,6 +139,25 @@ def run(
     *,
     force_recompute: bool = False,
     data_root: str = DATA_ROOT_DEFAULT,
+    layout: str = "year",
+    pyramid_levels: Tuple[int, ...] = (),
+    namespaced: bool = False,
+    persist_seconds: bool = False,
+    allocation_config: Dict | None = None,
+    data_mapping_mode: str = DEFAULT_HISTORY_MODES["data_mapping_mode"],
+    data_normalization_mode: str = DEFAULT_HISTORY_MODES["data_normalization_mode"],
+    workers: int = 1,
+    pipeline: bool = False,
+    prefetch: int = 2,
+    history_chunk_days: int = 1,
+    history_chunk_max_mb: float = 1024.0,
+    exchange_calendar: bool = False,
+    session_windows: bool = False,
+    checkpoint: bool = False,
+    commit_every_days: int = 20,
+    memory_budget_mb: float = 256.0,
+    history_retries: int = 0,
+    retry_backoff_s: float = 1.0,
 ) -> None:
     """
     顶层调度：
@@ -80,14 +167,619 @@ def run(
       - 支持覆盖模式
     说明：
       - 时间与时区：完全采用 history 返回的时间，不做任何转换
-      - 无并发
+      - workers=1：逐日串行；workers>1：history 仍在主线程按日请求（qb 只能在主线程使用），
+        秒级分配与 V 切分交给 ProcessPoolExecutor（fork，全部子进程在主线程上预先启动，见 _start_worker_pool）并行，
+        结果按日期顺序收集，与串行输出逐位一致
+      - pipeline=True：取数 / 计算 / 写入三段重叠执行（见 _run_pipeline），取数最多领先 prefetch 日，
+        整年算完即写入，不等全部日期；输出与串行一致。结束时打印各阶段利用率（忙碌时间 / 总耗时）以定位瓶颈
+      - history_chunk_days>1：连续缺口日合并为一次 history 请求（至多该日数），在内存中用 searchsorted 按日切分，
+        日边界语义与单日请求相同；块大小按已观测的每日内存占用自适应，单块不超过 history_chunk_max_mb
+      - layout="day"：每日写独立分片（增量追加，不重写年度文件），之后可用 footprint_storage.compact_year 合并
+      - pyramid_levels：写入后为有更新的年份预计算这些 V 的聚合层（如 (2*V, 5*V, 10*V, 20*V)）
+      - namespaced=False（默认）：沿用 data_root/symbol/year.parquet，现有读取方与已有数据不受影响；
+        namespaced=True：写入 get_store_root(data_root, v_unit, 分配参数) 命名空间，多种 V 可并存，
+        读取时以同一 store_root 作为 data_root（validator.validate_daily_open 传 v_unit 即可）
+      - persist_seconds=True：每日秒级分配按配置 hash 缓存于 get_seconds_root(...)；已缓存的日不再请求 history，
+        rebuild_from_seconds 也从这里切分新的 V
+      - allocation_config：分配参数（mode / alpha / n_min / n_max，缺省为 DEFAULT_ALLOCATION_CONFIG）；
+        与 tick_size、data_mapping_mode / data_normalization_mode（LEAN 枚举名）一起构成 artifact_config，
+        其 hash 按日记入元数据，以其他配置构建的日期视为过期并重算
+      - exchange_calendar=False（默认）：逐个自然日处理，无数据的日记入 no_data_dates（与既有数据的日期集合一致）；
+        True：只处理交易所开市日（footprint_calendar.trading_days，含延长时段），周末与节假日不请求 history、不写元数据
+      - session_windows=False（默认）：每日窗口为整个自然日，日边界与既有数据一致；
+        True：每个交易日只请求交易所开市时段（footprint_calendar.session_window，含延长时段，
+        换算到 qb.time_zone，交易所时区不同时窗口可跨越本地午夜），每日数据按该窗口切分，bar 的 trade_date 记为该交易日，
+        相邻窗口首尾相接时（如次日 00:00）接缝处的一帧计入后一交易日。日边界不同，已有数据须 force_recompute 重建
+      - checkpoint=True：每累计 commit_every_days 个日、或暂存 bar 超过 memory_budget_mb 时即提交该年已完成的日
+        （年度文件原子替换 + 元数据原子写入），并向进度日志（footprint_storage.append_progress_journal）追加一行；
+        中断后重跑由元数据跳过已提交的日，从中断处继续。金字塔层只在整年收尾时构建
+      - history_retries>0：history 请求失败时按 retry_backoff_s * 2**k 退避重试，用尽后抛出
+      - 多个品种一起构建见 run_many
+    """
+    # 进程池先于规划（读元数据 / parquet）与各阶段线程创建：fork 时主进程只有主线程（见 _start_worker_pool）
+    pool = _start_worker_pool(workers)
+    try:
+        build = _SymbolBuild(
+            qb, symbol, start_date, end_date, v_unit, tick_size,
+            force_recompute=force_recompute,
+            data_root=data_root,
+            layout=layout,
+            pyramid_levels=pyramid_levels,
+            namespaced=namespaced,
+            persist_seconds=persist_seconds,
+            allocation_config=allocation_config,
+            data_mapping_mode=data_mapping_mode,
+            data_normalization_mode=data_normalization_mode,
+            history_chunk_days=history_chunk_days,
+            history_chunk_max_mb=history_chunk_max_mb,
+            exchange_calendar=exchange_calendar,
+            session_windows=session_windows,
+            checkpoint=checkpoint,
+            commit_every_days=commit_every_days,
+            memory_budget_mb=memory_budget_mb,
+            history_retries=history_retries,
+            retry_backoff_s=retry_backoff_s,
+        )
+        build.pool = pool
+        # 如果没有缺口且不是强制覆盖，直接返回
+        if not build.has_work:
+            return
+
+        build.report_resume()
+        if pipeline:
+            _run_pipeline(
+                build.fetch_days(), build.compute, build.write, build.finish_year, build.clock,
+                max(prefetch, 2 * workers if pool is not None else 1),
+            )
+        else:
+            # 待收集的日结果（FIFO，保证按日期顺序写入）；进程池时在途日数有上限，避免取数远快于计算时堆积内存
+            pending: Deque[Tuple[int, datetime, int, str, object]] = deque()
+            limit = 2 * workers if pool is not None else 0
+            for item in build.clock.timed("fetch", build.fetch_days()):
+                if item is None:
+                    continue
+                pending.append(item)
+                while len(pending) > limit:
+                    build.process(pending.popleft())
+            while pending:
+                build.process(pending.popleft())
+            build.finish()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    print(build.clock.report())
+
+
+class _SymbolBuild:
     """
+    单个 (symbol, v_unit, 日期区间) 的构建：规划缺口日（元数据），并提供三段操作
+      fetch_days（主线程取数，逐日产出）-> compute（单日计算并暂存）-> write（提交一批 / 整年收尾）。
+    run 驱动一个构建；run_many 交错驱动多个构建并共享同一进程池（pool 由驱动方设置）。
+    """
+    def __init__(
+        self,
+        qb,
+        symbol: object,
+        start_date: date,
+        end_date: date,
+        v_unit: int,
+        tick_size: float,
+        *,
+        force_recompute: bool = False,
+        data_root: str = DATA_ROOT_DEFAULT,
+        layout: str = "year",
+        pyramid_levels: Tuple[int, ...] = (),
+        namespaced: bool = False,
+        persist_seconds: bool = False,
+        allocation_config: Dict | None = None,
+        data_mapping_mode: str = DEFAULT_HISTORY_MODES["data_mapping_mode"],
+        data_normalization_mode: str = DEFAULT_HISTORY_MODES["data_normalization_mode"],
+        history_chunk_days: int = 1,
+        history_chunk_max_mb: float = 1024.0,
+        exchange_calendar: bool = False,
+        session_windows: bool = False,
+        checkpoint: bool = False,
+        commit_every_days: int = 20,
+        memory_budget_mb: float = 256.0,
+        history_retries: int = 0,
+        retry_backoff_s: float = 1.0,
+    ):
+        self.qb = qb
+        self.symbol = symbol
+        self.v_unit = v_unit
+        self.tick_size = tick_size
+        self.force_recompute = force_recompute
+        self.layout = layout
+        self.pyramid_levels = pyramid_levels
+        self.persist_seconds = persist_seconds
+        self.data_mapping_mode = data_mapping_mode
+        self.data_normalization_mode = data_normalization_mode
+        self.history_chunk_days = history_chunk_days
+        self.history_chunk_max_mb = history_chunk_max_mb
+        self.session_windows = session_windows
+        self.checkpoint = checkpoint
+        self.commit_every_days = commit_every_days
+        self.memory_budget_mb = memory_budget_mb
+        self.history_retries = history_retries
+        self.retry_backoff_s = retry_backoff_s
+        self.pool: ProcessPoolExecutor | None = None
+        self.clock = _StageClock(("fetch", "compute", "write"))
+        self.days_done = 0
+        self.bars_done = 0
 
-    days = _daterange_days(start_date, end_date)
-    if not days:
-        return
+        self.days = trading_days(symbol, start_date, end_date) if exchange_calendar else _daterange_days(start_date, end_date)
+        self.allocation_config = normalize_allocation_config(allocation_config)
+        history_modes = {"data_mapping_mode": data_mapping_mode, "data_normalization_mode": data_normalization_mode}
+        self.config = artifact_config(self.allocation_config, tick_size, history_modes)
+        self.config_hash = artifact_config_hash(self.allocation_config, tick_size, history_modes)
+        self.seconds_root = get_seconds_root(data_root, self.allocation_config, tick_size, history_modes)
+        if namespaced and self.days:
+            data_root = get_store_root(data_root, v_unit, self.allocation_config)
+            write_store_manifest(data_root, v_unit, self.allocation_config)
+        self.data_root = data_root
+
+        # 预先基于元数据检测缺失日期（每年）
+        self.years = sorted(set(d.year for d in self.days))
+        self.year_to_missing = _plan_missing_dates(
+            symbol, self.days, force_recompute, data_root, v_unit, self.config_hash,
+        ) if self.days else {}
+
+        # 待写入的日结果、无数据日与已处理日；已提交（写入存储）的日期：检查点模式下按批提交，
+        # 整年收尾时只覆盖尚未提交的缺口日
+        self.year_to_day_frames: Dict[int, List[FootprintBatch]] = {y: [] for y in self.years}
+        self.year_to_no_data: Dict[int, List[int]] = {y: [] for y in self.years}
+        self.year_to_pending_dates: Dict[int, List[int]] = {y: [] for y in self.years}
+        self.year_to_committed: Dict[int, set] = {y: set() for y in self.years}
+        self.years_written: set = set()
+        self.years_finalized: set = set()
+        self.open_year: int | None = None
+        # 分块请求：按已观测的每日内存占用自适应块大小，使单块不超过 history_chunk_max_mb
+        self.bytes_per_day: int | None = None
+
+    @property
+    def has_work(self) -> bool:
+        return bool(self.year_to_missing)
+
+    @property
+    def missing_count(self) -> int:
+        return sum(len(v) for v in self.year_to_missing.values())
+
+    def report_resume(self) -> None:
+        if self.checkpoint:
+            done = committed_dates_from_journal(self.symbol, self.data_root)
+            if done:
+                print(f"resuming: {len(done)} days committed by earlier runs, last {max(done)}")
+
+    # ---- fetch（主线程） ----
+    def _chunk_limit(self) -> int:
+        if self.history_chunk_days <= 1:
+            return 1
+        if self.bytes_per_day is None:
+            return 1  # 首块只取一日，用于估计每日内存
+        return int(max(1, min(self.history_chunk_days, self.history_chunk_max_mb * 1024 * 1024 // max(self.bytes_per_day, 1))))
+
+    def fetch_days(self) -> Iterator[Tuple[int, datetime, int, str, object]]:
+        """
+        取数阶段（主线程）：按日期顺序产出 (year, start_dt, td, kind, payload)。
+        需要请求 history 的连续日合并为一次请求（至多 _chunk_limit() 日），再在内存中按日切分。
+        """
+        chunk: List[date] = []
+        for d in self.days:
+            y = d.year
+            td = _yyyymmdd(d)
+            # 若该年该日不是缺口且不覆盖，跳过
+            if not self.force_recompute and (y not in self.year_to_missing or td not in self.year_to_missing[y]):
+                yield from self._fetch_chunk(chunk)
+                chunk = []
+                continue
+            # 同一配置下已缓存的秒级分配：直接切分，不请求 history、不重跑分配
+            layer = read_second_layer(self.symbol, td, self.seconds_root, tick_size=self.tick_size) if self.persist_seconds else None
+            if layer is not None:
+                yield from self._fetch_chunk(chunk)
+                chunk = []
+                yield y, datetime(d.year, d.month, d.day, 0, 0, 0), td, "layer", layer
+                continue
+            chunk.append(d)
+            if len(chunk) >= self._chunk_limit():
+                yield from self._fetch_chunk(chunk)
+                chunk = []
+        yield from self._fetch_chunk(chunk)
+
+    def _window(self, d: date) -> Tuple[datetime, datetime] | None:
+        if self.session_windows:
+            return session_window(self.symbol, d, extended_market_hours=True, time_zone=getattr(self.qb, "time_zone", None))
+        day_start = datetime(d.year, d.month, d.day, 0, 0, 0)
+        return day_start, day_start + timedelta(days=1)
+
+    def _history(self, start_dt: datetime, end_dt: datetime) -> pd.DataFrame:
+        attempt = 0
+        while True:
+            try:
+                return self.qb.history(self.symbol, start_dt, end_dt, 
+                                resolution=Resolution.SECOND,
+                                extended_market_hours=True,
+                                data_mapping_mode=getattr(DataMappingMode, self.data_mapping_mode), # 数据映射模式，这个会根据交易量切换到当年后续更大的合约，Warning, 但正确性有待验证
+                                data_normalization_mode=getattr(DataNormalizationMode, self.data_normalization_mode), # 数据连续模式，ATAS是RAW, tradingview 是BACKWARDS_RATIO，能够使得连续。注意，实盘需要使用当期合约数据
+                                fill_forward=True
+                                )
+            except Exception as e:
+                if attempt >= self.history_retries:
+                    raise
+                delay = self.retry_backoff_s * (2 ** attempt)
+                attempt += 1
+                print(f"history {self.symbol} {start_dt} -> {end_dt} failed ({e}); retry {attempt}/{self.history_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _fetch_chunk(self, chunk: List[date]) -> Iterator[Tuple[int, datetime, int, str, object]]:
+        if not chunk:
+            return
+        windows = [self._window(d) for d in chunk]
+        opened = [w for w in windows if w is not None]
+        df_norm = pd.DataFrame()
+        if opened:
+            # 只请求开市时段：首个交易日首段开始 -> 最后交易日末段结束
+            df_hist = self._history(opened[0][0], opened[-1][1])
+            df_norm = _normalize_history_df(df_hist, self.symbol)
+            del df_hist
+            if self.history_chunk_days > 1 and not df_norm.empty:
+                self.bytes_per_day = int(df_norm.memory_usage(index=True).sum()) // len(chunk)
+        # 按日切分（索引已排序）：第 d 日取其开市窗口 [开始, 结束]（可跨越本地午夜）；
+        # 下一自然日的窗口恰从本窗口结束处开始时（整日窗口、跨午夜连续交易）不含结束帧，该帧属于下一交易日
+        for d, w in zip(chunk, windows):
+            if w is None or df_norm.empty:
+                yield self._fetch_item(d, pd.DataFrame())
+                continue
+            nxt = self._window(d + timedelta(days=1))
+            lo = int(df_norm.index.searchsorted(w[0], side="left"))
+            hi = int(df_norm.index.searchsorted(w[1], side="left" if nxt is not None and nxt[0] == w[1] else "right"))
+            yield self._fetch_item(d, df_norm if (lo == 0 and hi == len(df_norm)) else df_norm.iloc[lo:hi].copy())
+
+    def _fetch_item(self, d: date, df_norm: pd.DataFrame) -> Tuple[int, datetime, int, str, object] | None:
+        """整理一日的秒级数据，返回 (year, start_dt, td, kind, payload)；无可用成交的日返回 None。"""
+        y = d.year
+        td = _yyyymmdd(d)
+        start_dt = datetime(d.year, d.month, d.day, 0, 0, 0)
+        if df_norm.empty:
+            # 无数据日：由写入阶段记录到元数据，后续缺口检测跳过
+            return y, start_dt, td, "no_data", None
+
+        prepared = prepare_second_arrays(df_norm)
+        if prepared is None:
+            return None
+        times, cols = prepared
+        # 秒级分配层：与 v_unit 无关，之后任意 V / 时间 bar 可直接切分
+        seconds_target = (_symbol_key(self.symbol), td, self.seconds_root, self.config) if self.persist_seconds else None
+        args = (times, cols, self.v_unit, self.tick_size, self.allocation_config, seconds_target, td)
+        if self.pool is not None:
+            return y, start_dt, td, "future", self.pool.submit(_build_day_batch, *args)
+        return y, start_dt, td, "args", args
+
+    # ---- compute ----
+    def take(self, y: int, final: bool) -> Tuple[int, List[FootprintBatch], List[int], List[int], bool]:
+        """取走 y 年待写入的日结果（计算侧调用），交给写入阶段。"""
+        job = (y, self.year_to_day_frames[y], self.year_to_no_data[y], self.year_to_pending_dates[y], final)
+        self.year_to_day_frames[y], self.year_to_no_data[y], self.year_to_pending_dates[y] = [], [], []
+        return job
+
+    def finish_year(self, y: int) -> Tuple[int, List[FootprintBatch], List[int], List[int], bool]:
+        return self.take(y, final=True)
+
+    def compute(self, y: int, start_dt: datetime, td: int, kind: str, payload: object) -> List[Tuple]:
+        """计算一日并暂存结果；检查点模式下达到提交条件时返回待写入的批（否则为空列表）。"""
+        self.year_to_pending_dates[y].append(td)
+        self.days_done += 1
+        if kind == "no_data":
+            self.year_to_no_data[y].append(td)
+        else:
+            if kind == "layer":
+                times, cols, alloc = payload
+                df_v = build_v_footprints_from_arrays(times, cols, alloc, self.v_unit, self.tick_size, output="batch", trade_date=td)
+            elif kind == "future":
+                df_v = payload.result()
+            else:
+                df_v = _build_day_batch(*payload)
+            if len(df_v) > 0:
+                self.year_to_day_frames[y].append(df_v)
+                self.bars_done += len(df_v)
+                print(f"{start_dt} finished")
+        if self.checkpoint and (
+            len(self.year_to_pending_dates[y]) >= self.commit_every_days
+            or sum(b.nbytes for b in self.year_to_day_frames[y]) >= self.memory_budget_mb * 1024 * 1024
+        ):
+            return [self.take(y, final=False)]
+        return []
+
+    def process(self, item: Tuple[int, datetime, int, str, object]) -> None:
+        """串行驱动：计算一日并立即写入产生的批；日期有序，遇到新年份即上一年全部完成，立即收尾写入。"""
+        jobs = [self.finish_year(self.open_year)] if self.open_year is not None and self.open_year != item[0] else []
+        self.open_year = item[0]
+        with self.clock.stage("compute"):
+            jobs += self.compute(*item)
+        for job in jobs:
+            with self.clock.stage("write"):
+                self.write(job)
+
+    def finish(self) -> None:
+        """其余年份收尾（检查点模式下为各年剩余部分）。"""
+        for y in self.years:
+            if y in self.years_finalized:
+                continue
+            with self.clock.stage("write"):
+                self.write(self.finish_year(y))
+
+    def abort(self) -> None:
+        """取数失败后的收尾：只提交已取到并计算的日，未取到的缺口日不覆盖、留待下次运行。"""
+        for y in self.years:
+            done = self.year_to_committed[y] | set(self.year_to_pending_dates[y])
+            self.year_to_missing[y] = [td for td in self.year_to_missing.get(y, []) if td in done]
+        self.finish()
+
+    # ---- write ----
+    def write(self, job: Tuple[int, List[FootprintBatch], List[int], List[int], bool]) -> None:
+        y, frames, no_data, dates, final = job
+        if final:
+            self.years_finalized.add(y)
+        if no_data:
+            append_no_data_dates(
+                symbol=self.symbol,
+                year=y,
+                no_data_dates=no_data,
+                v_unit=self.v_unit,
+                tick_size=self.tick_size,
+                data_root=self.data_root
+            )
+        # 覆盖日期：中间批只覆盖本批的日；整年收尾覆盖其余缺口日（不触碰已提交的日）
+        force_dates = set(dates) if not final else set(self.year_to_missing.get(y, [])) - self.year_to_committed[y]
+        _write_year_batches(
+            self.symbol, self.v_unit, self.tick_size, [y], {y: frames}, {y: sorted(force_dates)},
+            self.data_root, self.layout, (), self.config_hash,
+        )
+        self.year_to_committed[y] |= set(dates)
+        if any(len(b) > 0 for b in frames):
+            self.years_written.add(y)
+        # 预计算金字塔层（基础层已更新，旧层随之过期）；检查点模式下只在整年收尾时构建一次
+        if final and self.pyramid_levels and y in self.years_written:
+            build_pyramid_levels(self.symbol, y, self.pyramid_levels, data_root=self.data_root)
+        if self.checkpoint and (dates or final):
+            append_progress_journal(self.symbol, self.data_root, {
+                "year": int(y),
+                "dates": sorted(int(x) for x in dates),
+                "no_data_dates": sorted(int(x) for x in no_data),
+                "bars": int(sum(len(b) for b in frames)),
+                "final": bool(final),
+                "v_unit": int(self.v_unit),
+                "config_hash": self.config_hash,
+            })
+
+    def throughput(self) -> Dict[str, float]:
+        wall = max(time.perf_counter() - self.clock.t0, 1e-9)
+        return {
+            "days": self.days_done,
+            "bars": self.bars_done,
+            "fetch_s": round(self.clock.busy["fetch"], 3),
+            "compute_s": round(self.clock.busy["compute"], 3),
+            "write_s": round(self.clock.busy["write"], 3),
+            "days_per_s": round(self.days_done / wall, 3),
+            "bars_per_s": round(self.bars_done / wall, 1),
+        }
+
+
+def run_many(
+    qb,
+    jobs: List[Tuple | Dict],
+    *,
+    workers: int = 1,
+    max_in_flight: int = 4,
+    history_retries: int = 3,
+    retry_backoff_s: float = 1.0,
+    **options,
+) -> Dict[str, Dict]:
+    """
+    多品种构建：jobs 为 (symbol, v_unit, tick_size, start_date, end_date) 元组或同名键的 dict，同一 symbol 与 v_unit
+    只能出现一次（重复时 ValueError）；
+    其余关键字参数（data_root / layout / checkpoint / history_chunk_days 等）与 run 相同，对所有任务生效。
+      - 先按元数据为全部任务规划缺口日，没有缺口的任务不请求 history
+      - history 仍在主线程请求（qb 只能在主线程使用）：各任务的取数轮流推进，每次取一日；
+        已取到但尚未计算的日（所有任务合计）不超过 max_in_flight，超出时先按 FIFO 计算并写入最早的日
+      - workers>1 时所有任务共用一个进程池
+      - history 失败按 history_retries / retry_backoff_s 退避重试；仍失败时记录该任务的错误，
+        提交其已计算的日后继续其余任务
+    返回并打印各任务的吞吐：{"symbol@vV": {days, bars, fetch_s, compute_s, write_s, days_per_s, bars_per_s, error}}
+    """
+    specs: Dict[str, Tuple] = {}
+    for job in jobs:
+        if isinstance(job, dict):
+            symbol, v_unit, tick_size = job["symbol"], job["v_unit"], job["tick_size"]
+            start_date, end_date = job["start_date"], job["end_date"]
+        else:
+            symbol, v_unit, tick_size, start_date, end_date = job
+        key = f"{_symbol_key(symbol)}@v{int(v_unit)}"
+        # 同一 symbol / V 写入同一存储，重复任务会互相覆盖进度与吞吐记录：须合并为一个日期区间
+        if key in specs:
+            raise ValueError(f"duplicate job {key}: merge its date ranges into one job")
+        specs[key] = (symbol, start_date, end_date, v_unit, tick_size)
 
-    # 预先基于元数据检测缺失日期（每年）
+    # 进程池先于规划（读元数据 / parquet）与取数创建，fork 时主进程只有主线程（见 _start_worker_pool）
+    pool = _start_worker_pool(workers)
+    try:
+        builds: Dict[str, _SymbolBuild] = {
+            key: _SymbolBuild(
+                qb, *spec, history_retries=history_retries, retry_backoff_s=retry_backoff_s, **options,
+            )
+            for key, spec in specs.items()
+        }
+        for key, build in builds.items():
+            print(f"{key}: {build.missing_count} missing days")
+
+        errors: Dict[str, str] = {}
+        active: Deque[Tuple[str, Iterator]] = deque((k, b.fetch_days()) for k, b in builds.items() if b.has_work)
+        # 已取数待计算的日（跨任务 FIFO）
+        pending: Deque[Tuple[str, Tuple[int, datetime, int, str, object]]] = deque()
+
+        def _drain(key: str | None = None, n: int = 0) -> None:
+            # key 给定时处理到该任务没有在途日为止（该任务随后收尾），否则处理到只剩 n 个
+            while pending and (any(k == key for k, _ in pending) if key is not None else len(pending) > n):
+                k, item = pending.popleft()
+                builds[k].process(item)
+
+        for build in builds.values():
+            build.pool = pool
+            if build.has_work:
+                build.report_resume()
+        while active:
+            key, fetch = active.popleft()
+            build = builds[key]
+            try:
+                with build.clock.stage("fetch"):
+                    item = next(fetch)
+            except StopIteration:
+                _drain(key)
+                build.finish()
+                continue
+            except Exception as e:
+                errors[key] = repr(e)
+                print(f"{key}: history failed after {history_retries} retries, committing fetched days ({e})")
+                _drain(key)
+                build.abort()
+                continue
+            if item is not None:
+                pending.append((key, item))
+                _drain(n=max(max_in_flight, 1))
+            active.append((key, fetch))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    report: Dict[str, Dict] = {}
+    for key, build in builds.items():
+        stats = build.throughput()
+        stats["error"] = errors.get(key)
+        report[key] = stats
+        print(
+            f"{key}: {stats['days']} days, {stats['bars']} bars, {stats['days_per_s']} days/s, "
+            f"fetch {stats['fetch_s']}s compute {stats['compute_s']}s write {stats['write_s']}s"
+            + (f", error {stats['error']}" if stats["error"] else "")
+        )
+    return report
+
+
+class _StageClock:
+    """按阶段累计忙碌时间，report() 给出各阶段利用率（忙碌时间 / 总耗时），用于判断瓶颈阶段。"""
+    def __init__(self, names: Tuple[str, ...]):
+        self.t0 = time.perf_counter()
+        self.busy: Dict[str, float] = {n: 0.0 for n in names}
+        self.items: Dict[str, int] = {n: 0 for n in names}
+
+    @contextmanager
+    def stage(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy[name] += time.perf_counter() - t
+            self.items[name] += 1
+
+    def timed(self, name: str, items: Iterator) -> Iterator:
+        """逐项迭代 items，生成每一项的耗时计入 name 阶段（用于生成器形式的取数阶段）。"""
+        it = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def utilization(self) -> Dict[str, float]:
+        wall = max(time.perf_counter() - self.t0, 1e-9)
+        return {n: b / wall for n, b in self.busy.items()}
+
+    def report(self) -> str:
+        wall = time.perf_counter() - self.t0
+        parts = [f"{n} {u:.0%} ({self.items[n]} items)" for n, u in self.utilization().items()]
+        return f"stage utilization over {wall:.1f}s: " + ", ".join(parts)
+
+
+def _run_pipeline(
+    items: Iterator,
+    compute: Callable,
+    write: Callable,
+    finish_year: Callable,
+    clock: _StageClock,
+    prefetch: int,
+) -> None:
+    """
+    三段流水线：主线程取数（迭代 items，qb.history 只能在主线程调用）-> 计算线程（compute）-> 写入线程（write）。
+    compute 返回需立即写入的批（检查点），整年完成时由 finish_year(year) 生成该年的收尾批。
+    阶段间为有界队列：取数最多领先计算 prefetch 日；任一阶段出错时其余阶段排空队列后结束，错误在主线程重新抛出。
+    items 若向 fork 进程池提交任务，进程池须在调用前已启动全部子进程（_start_worker_pool），各阶段线程中不得发生 fork。
+    """
+    fetch_q: queue.Queue = queue.Queue(maxsize=max(int(prefetch), 1))
+    write_q: queue.Queue = queue.Queue()
+    errors: List[BaseException] = []
+
+    def _compute_stage() -> None:
+        current_year = None
+        while True:
+            item = fetch_q.get()
+            if item is None:
+                break
+            if errors:
+                continue
+            try:
+                # 日期有序：遇到新年份即上一年全部完成，交给写入阶段
+                if current_year is not None and item[0] != current_year:
+                    write_q.put(finish_year(current_year))
+                current_year = item[0]
+                with clock.stage("compute"):
+                    jobs = compute(*item)
+                for job in jobs:
+                    write_q.put(job)
+            except BaseException as e:
+                errors.append(e)
+        if current_year is not None and not errors:
+            write_q.put(finish_year(current_year))
+        write_q.put(None)
+
+    def _write_stage() -> None:
+        while True:
+            job = write_q.get()
+            if job is None:
+                break
+            if errors:
+                continue
+            try:
+                with clock.stage("write"):
+                    write(job)
+            except BaseException as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=_compute_stage, daemon=True), threading.Thread(target=_write_stage, daemon=True)]
+    for t in threads:
+        t.start()
+    try:
+        for item in clock.timed("fetch", items):
+            if errors:
+                break
+            if item is not None:
+                fetch_q.put(item)
+    finally:
+        fetch_q.put(None)
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+
+
+def _plan_missing_dates(
+    symbol: object,
+    days: List[date],
+    force_recompute: bool,
+    data_root: str,
+    v_unit: int,
+    config_hash: str | None = None,
+) -> Dict[int, List[int]]:
+    """按年检测缺口日期（元数据 + 无数据日 + 配置过期），返回 {year: [yyyymmdd, ...]}，无缺口的年份不出现。"""
     years = sorted(set(d.year for d in days))
     year_to_target_dates: Dict[int, List[int]] = {y: [] for y in years}
     for d in days:
@@ -101,64 +793,32 @@ def run(
             target_dates=year_to_target_dates[y],
             force_recompute=force_recompute,
             data_root=data_root,
+            v_unit=v_unit,
+            config_hash=config_hash,
         )
         if missing:
             year_to_missing[y] = sorted(list(missing))
+    return year_to_missing
 
-    # 如果没有缺口且不是强制覆盖，直接返回
-    if not year_to_missing:
-        return
 
-    # 收集每年待写入的日结果
-    year_to_day_frames: Dict[int, List[pd.DataFrame]] = {y: [] for y in years}
-
-    for d in days:
-        y = d.year
-        td = _yyyymmdd(d)
-        # 若该年该日不是缺口且不覆盖，跳过
-        if not force_recompute and (y not in year_to_missing or td not in year_to_missing[y]):
-            continue
-
-        start_dt = datetime(d.year, d.month, d.day, 0, 0, 0)
-        end_dt = start_dt + timedelta(days=1)
-        df_hist = qb.history(symbol, start_dt, end_dt, 
-                        resolution=Resolution.SECOND,
-                        extended_market_hours=True,
-                        data_mapping_mode=DataMappingMode.OPEN_INTEREST_ANNUAL, # 数据映射模式，这个会根据交易量切换到当年后续更大的合约，Warning, 但正确性有待验证
-                        data_normalization_mode=DataNormalizationMode.RAW, # 数据连续模式，ATAS是RAW, tradingview 是BACKWARDS_RATIO，能够使得连续。注意，实盘需要使用当期合约数据
-                        fill_forward=True
-                        )
-
-        df_norm = _normalize_history_df(df_hist, symbol)
-        if df_norm.empty:
-            # 无数据日：记录到元数据，后续缺口检测跳过
-            from footprint_storage import append_no_data_dates
-            append_no_data_dates(
-                symbol=symbol,
-                year=y,
-                no_data_dates=[td],
-                v_unit=v_unit,
-                tick_size=tick_size,
-                data_root=data_root
-            )
-            continue
-        #注意，这里，history请求的当日数据的末尾可能已经到了00:00：00，这是下一天的数据，一般来说没有数据，但以防万一，我们把这一帧的交易删掉。
-        mask_non_first_date = df_norm.index.date != start_dt.date()
-        df_norm.loc[mask_non_first_date, 'volume'] = 0.0
-
-        df_v = build_v_footprints(df_norm, v_unit=v_unit, tick_size=tick_size)
-        if df_v is None or df_v.empty:
-            continue
-        year_to_day_frames[y].append(df_v)
-        print(f"{start_dt} finished")
-
-    # 按年批量写入
+def _write_year_batches(
+    symbol: object,
+    v_unit: int,
+    tick_size: float,
+    years: List[int],
+    year_to_day_frames: Dict[int, List[FootprintBatch]],
+    year_to_missing: Dict[int, List[int]],
+    data_root: str,
+    layout: str,
+    pyramid_levels: Tuple[int, ...],
+    config_hash: str | None = None,
+) -> None:
     for y in years:
-        frames = [df for df in year_to_day_frames.get(y, []) if df is not None and not df.empty]
+        frames = [b for b in year_to_day_frames.get(y, []) if b is not None and len(b) > 0]
         if not frames:
             continue
         # 覆盖日期集合（仅这些日期从旧文件中剔除）
-        force_dates = year_to_missing.get(y, []) if force_recompute else year_to_missing.get(y, [])
+        force_dates = year_to_missing.get(y, [])
         append_days(
             symbol=symbol,
             v_unit=v_unit,
@@ -167,7 +827,67 @@ def run(
             tick_size=tick_size,
             force_recompute_dates=force_dates,
             data_root=data_root,
+            layout=layout,
+            config_hash=config_hash,
         )
+        # 预计算金字塔层（基础层已更新，旧层随之过期）
+        if pyramid_levels:
+            build_pyramid_levels(symbol, y, pyramid_levels, data_root=data_root)
+
+
+def rebuild_from_seconds(
+    symbol: object,
+    start_date: date,
+    end_date: date,
+    v_unit: int,
+    tick_size: float,
+    *,
+    force_recompute: bool = False,
+    data_root: str = DATA_ROOT_DEFAULT,
+    layout: str = "year",
+    pyramid_levels: Tuple[int, ...] = (),
+    namespaced: bool = False,
+    allocation_config: Dict | None = None,
+    data_mapping_mode: str = DEFAULT_HISTORY_MODES["data_mapping_mode"],
+    data_normalization_mode: str = DEFAULT_HISTORY_MODES["data_normalization_mode"],
+    exchange_calendar: bool = False,
+) -> List[int]:
+    """
+    不请求 history、不重跑秒级分配：从已持久化的秒级分配层（run(..., persist_seconds=True) 写入）
+    为新的 v_unit 切分 V-bar 并写入对应存储。配置参数须与写入秒级层的 run 一致。
+    缺少秒级层的日期不处理，以列表返回（需用 run 补齐）。exchange_calendar 同 run。
+    """
+    days = trading_days(symbol, start_date, end_date) if exchange_calendar else _daterange_days(start_date, end_date)
+    if not days:
+        return []
+    allocation_config = normalize_allocation_config(allocation_config)
+    history_modes = {"data_mapping_mode": data_mapping_mode, "data_normalization_mode": data_normalization_mode}
+    config_hash = artifact_config_hash(allocation_config, tick_size, history_modes)
+    seconds_root = get_seconds_root(data_root, allocation_config, tick_size, history_modes)
+    if namespaced:
+        data_root = get_store_root(data_root, v_unit, allocation_config)
+        write_store_manifest(data_root, v_unit, allocation_config)
+
+    years = sorted(set(d.year for d in days))
+    year_to_missing = _plan_missing_dates(symbol, days, force_recompute, data_root, v_unit, config_hash)
+    year_to_day_frames: Dict[int, List[FootprintBatch]] = {y: [] for y in years}
+    unavailable: List[int] = []
+    for y, dates in year_to_missing.items():
+        for td in dates:
+            layer = read_second_layer(symbol, td, seconds_root, tick_size=tick_size)
+            if layer is None:
+                unavailable.append(td)
+                continue
+            times, cols, alloc = layer
+            batch = build_v_footprints_from_arrays(times, cols, alloc, v_unit, tick_size, output="batch", trade_date=td)
+            if len(batch) > 0:
+                year_to_day_frames[y].append(batch)
+
+    _write_year_batches(
+        symbol, v_unit, tick_size, years, year_to_day_frames, year_to_missing, data_root, layout, pyramid_levels,
+        config_hash,
+    )
+    return unavailable
 
 
 # endregion
@@ -0,0 +1,10 @@
+import importlib.util
+import os
+import sys
+
+# modules live flat in 02_data_aggragate and import each other by bare name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# every module does `from AlgorithmImports import *`; outside a LEAN environment there is nothing to collect
+if importlib.util.find_spec("AlgorithmImports") is None:
+    collect_ignore_glob = ["test_*.py"]
@@ -0,0 +1,64 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from footprint_aggregator import build_v_footprints
+from footprint_reaggregator import (
+    aggregate_batch,
+    iter_aggregate_range_batches,
+    iter_range_batches_at_v,
+    read_and_aggregate_range,
+)
+from test_build_v_footprints import _second_df
+
+
+@pytest.mark.parametrize("target_v", [0, -1, -250])
+def test_non_positive_target_v_raises(target_v):
+    batch = build_v_footprints(_second_df(), 50, 0.25, output="batch")
+    with pytest.raises(ValueError):
+        aggregate_batch(batch, target_v)
+
+
+@pytest.mark.parametrize("entry", [read_and_aggregate_range, iter_aggregate_range_batches, iter_range_batches_at_v])
+def test_non_positive_target_v_raises_before_reading(entry, tmp_path):
+    # an empty store must still raise instead of silently yielding nothing
+    with pytest.raises(ValueError):
+        next(iter(entry("ES", date(2024, 3, 4), date(2024, 3, 8), 0, str(tmp_path))))
+
+
+def test_aggregate_batch_conserves_volume():
+    batch = build_v_footprints(_second_df(), 50, 0.25, output="batch")
+    agg = aggregate_batch(batch, 200)
+    assert 0 < len(agg) < len(batch)
+    assert int(agg.total_volume.sum()) == int(batch.total_volume.sum())
+    assert np.all(agg.total_volume[:-1] >= 200)
+
+
+def _assert_batches_equal(a, b):
+    assert len(a) == len(b)
+    for name in ("trade_date", "start_time", "end_time", "open_i", "high_i", "low_i", "close_i",
+                 "total_volume", "prices_i", "vol_buy", "vol_sell", "offsets"):
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
+
+
+def test_range_at_v_defaults_to_exact(tmp_path):
+    from footprint_batch import FootprintBatch
+    from footprint_storage import append_days, build_pyramid_levels
+
+    root = str(tmp_path)
+    batch = build_v_footprints(_second_df(n=2000, seed=4), 10, 0.25, output="batch")
+    append_days("ES", 10, 2024, [batch], 0.25, data_root=root)
+    build_pyramid_levels("ES", 2024, [40], data_root=root)
+    start, end = date(2024, 3, 5), date(2024, 3, 5)
+
+    exact = FootprintBatch.concat(list(iter_aggregate_range_batches("ES", start, end, 120, root)))
+    # no v120 level: the default must not approximate from v40
+    _assert_batches_equal(FootprintBatch.concat(list(iter_range_batches_at_v("ES", start, end, 120, root))), exact)
+    # an exact level is read back as is
+    _assert_batches_equal(
+        FootprintBatch.concat(list(iter_range_batches_at_v("ES", start, end, 40, root))),
+        FootprintBatch.concat(list(iter_aggregate_range_batches("ES", start, end, 40, root))),
+    )
+    approx = FootprintBatch.concat(list(iter_range_batches_at_v("ES", start, end, 120, root, exact_only=False)))
+    assert int(approx.total_volume.sum()) == int(exact.total_volume.sum())
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from footprint_aggregator import build_v_footprints, build_v_footprints_from_arrays, prepare_second_arrays
+from footprint_utils import allocate_day
+
+
+def _second_df(n: int = 300, seed: int = 0, tick_size: float = 0.25) -> pd.DataFrame:
+    """Synthetic RAW second bars in the qb.history column layout (trade + bid/ask OHLC)."""
+    rng = np.random.default_rng(seed)
+    mid = 18000.0 + np.cumsum(rng.integers(-2, 3, n)) * tick_size
+    o = mid + rng.integers(-1, 2, n) * tick_size
+    c = mid + rng.integers(-1, 2, n) * tick_size
+    h = np.maximum(o, c) + rng.integers(0, 3, n) * tick_size
+    l = np.minimum(o, c) - rng.integers(0, 3, n) * tick_size
+    bid_o, bid_c = o - tick_size, c - tick_size
+    ask_o, ask_c = o + tick_size, c + tick_size
+    df = pd.DataFrame(
+        dict(
+            open=o, high=h, low=l, close=c, volume=rng.choice([0, 1, 2, 5, 20, 95], n).astype(float),
+            bidopen=bid_o, bidhigh=np.maximum(bid_o, bid_c), bidlow=np.minimum(bid_o, bid_c), bidclose=bid_c,
+            askopen=ask_o, askhigh=np.maximum(ask_o, ask_c), asklow=np.minimum(ask_o, ask_c), askclose=ask_c,
+        ),
+        index=pd.date_range("2024-03-05 09:30:00", periods=n, freq="s", name="time"),
+    )
+    return df
+
+
+@pytest.mark.parametrize("v_unit", [0, -1, -100, 0.5])
+@pytest.mark.parametrize("cut_mode", ["vectorized", "loop"])
+def test_non_positive_v_unit_raises(v_unit, cut_mode):
+    df = _second_df()
+    with pytest.raises(ValueError):
+        build_v_footprints(df, v_unit, 0.25, cut_mode=cut_mode)
+    times, cols = prepare_second_arrays(df)
+    alloc = allocate_day(cols, tick_size=0.25)
+    with pytest.raises(ValueError):
+        build_v_footprints_from_arrays(times, cols, alloc, v_unit, 0.25, cut_mode=cut_mode)
+
+
+@pytest.mark.parametrize("v_unit", [1, 50, 10 ** 9])
+def test_vectorized_matches_loop(v_unit):
+    df = _second_df(seed=v_unit % 7)
+    a = build_v_footprints(df, v_unit, 0.25, cut_mode="vectorized", output="batch")
+    b = build_v_footprints(df, v_unit, 0.25, cut_mode="loop", output="batch")
+    assert len(a) == len(b) > 0
+    assert int(a.total_volume.sum()) == int(df["volume"].sum())
+    for name in ("trade_date", "open_i", "high_i", "low_i", "close_i", "total_volume", "prices_i", "vol_buy", "offsets"):
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
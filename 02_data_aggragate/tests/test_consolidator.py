@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+import numpy as np
+
+from footprint_consolidator import create_footprints_from_history
+from footprint_utils import micro_allocate_volume_raw
+from test_build_v_footprints import _second_df
+
+
+def test_tick_grid_bars_carry_integer_ladder():
+    df = _second_df(n=600, seed=5)
+    bars = create_footprints_from_history(df, timedelta(minutes=1), 0.25)
+    assert len(bars) > 1
+    assert sum(int(b.vol_buy_np.sum() + b.vol_sell_np.sum()) for b in bars) == int(df["volume"].sum())
+    for b in bars:
+        assert int(b.vol_buy_np.sum() + b.vol_sell_np.sum()) == int(round(b.total_volume))
+        assert np.all(np.diff(b.prices_i_np) > 0)
+        vap = b.volume_at_price
+        assert sorted(vap) == (b.prices_i_np * 0.25).tolist()
+
+
+def test_no_tick_grid_keeps_exact_prices():
+    df = _second_df(n=120, seed=6, tick_size=0.1)
+    bars = create_footprints_from_history(df, timedelta(minutes=1), 0.0)
+    expected = {}
+    for row in df.itertuples():
+        _, _, deltas = micro_allocate_volume_raw(
+            row.open, row.high, row.low, row.close, row.volume,
+            row.bidopen, row.bidhigh, row.bidlow, row.bidclose,
+            row.askopen, row.askhigh, row.asklow, row.askclose,
+            tick_size=0.0,
+        )
+        for price, incs in deltas.items():
+            e = expected.setdefault(price, {"bid": 0.0, "ask": 0.0})
+            e["bid"] += incs["bid"]
+            e["ask"] += incs["ask"]
+    merged = {}
+    for b in bars:
+        assert b.prices_i_np.size == 0
+        for price, e in b.volume_at_price.items():
+            m = merged.setdefault(price, {"bid": 0.0, "ask": 0.0})
+            m["bid"] += e["bid"]
+            m["ask"] += e["ask"]
+    assert sorted(merged) == sorted(expected)
+    # prices are the raw path prices, not rounded to whole units
+    assert any(p != round(p) for p in merged)
+    for price in expected:
+        assert np.isclose(merged[price]["bid"], expected[price]["bid"])
+        assert np.isclose(merged[price]["ask"], expected[price]["ask"])
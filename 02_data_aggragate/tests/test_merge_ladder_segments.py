@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from footprint_reaggregator import _merge_ladder_segments
+
+
+def _reference(prices_i, vol_buy, vol_sell, bounds):
+    """Per-segment dict merge: every tick that appears is kept, sorted by tick."""
+    offsets, prices, buys, sells = [0], [], [], []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        acc = {}
+        for p, vb, vs in zip(prices_i[a:b].tolist(), vol_buy[a:b].tolist(), vol_sell[a:b].tolist()):
+            cur = acc.setdefault(p, [0, 0])
+            cur[0] += vb
+            cur[1] += vs
+        for p in sorted(acc):
+            prices.append(p)
+            buys.append(acc[p][0])
+            sells.append(acc[p][1])
+        offsets.append(len(prices))
+    return offsets, prices, buys, sells
+
+
+def _assert_matches(prices_i, vol_buy, vol_sell, bounds):
+    offsets, prices, buys, sells = _merge_ladder_segments(prices_i, vol_buy, vol_sell, bounds)
+    ref = _reference(prices_i, vol_buy, vol_sell, bounds)
+    assert offsets.tolist() == ref[0]
+    assert prices.tolist() == ref[1]
+    assert buys.tolist() == ref[2]
+    assert sells.tolist() == ref[3]
+
+
+@pytest.mark.parametrize(
+    "bounds",
+    [
+        [0, 3, 5, 5],
+        [0, 3, 5, 5, 5],
+        [0, 0, 3, 5],
+        [0, 0, 3, 3, 5, 5],
+        [0, 5, 5],
+        [0, 0, 5],
+        [0, 1, 2, 3, 4, 5],
+    ],
+)
+def test_empty_segments(bounds):
+    prices_i = np.array([5, 3, 5, 7, 8], dtype=np.int32)
+    vol_buy = np.array([1, 2, 3, 4, 5], dtype=np.int32)
+    vol_sell = np.array([1, 1, 1, 1, 1], dtype=np.int32)
+    _assert_matches(prices_i, vol_buy, vol_sell, np.array(bounds, dtype=np.int64))
+
+
+def test_all_segments_empty():
+    prices_i = np.empty(0, dtype=np.int32)
+    offsets, prices, buys, sells = _merge_ladder_segments(prices_i, prices_i, prices_i, np.zeros(4, dtype=np.int64))
+    assert offsets.tolist() == [0, 0, 0, 0]
+    assert prices.size == buys.size == sells.size == 0
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_random_segmentations(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 200))
+    prices_i = rng.integers(18000, 18040, n).astype(np.int32)
+    vol_buy = rng.integers(0, 500, n).astype(np.int32)
+    vol_sell = rng.integers(0, 500, n).astype(np.int32)
+    # cuts may repeat (empty segments anywhere, including at both ends)
+    cuts = np.sort(rng.integers(0, n + 1, int(rng.integers(0, 20))))
+    bounds = np.concatenate(([0], cuts, [n], [n] * int(rng.integers(0, 3)))).astype(np.int64)
+    _assert_matches(prices_i, vol_buy, vol_sell, bounds)
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from footprint_aggregator import _round_segments_preserve_total, _round_series_preserve_total
+
+
+def _random_case(rng: np.random.Generator):
+    """One random ladder: sparse non-negative floats (with exact ties and all-zero rows) and a target."""
+    size = int(rng.integers(1, 40))
+    kind = rng.integers(0, 5)
+    if kind == 0:
+        values = np.zeros(size)
+    elif kind == 1:
+        values = np.full(size, float(rng.integers(1, 5)))  # every remainder tied
+    else:
+        values = rng.exponential(50.0, size) * (rng.random(size) < 0.7)
+    target = int(rng.choice([0, 1, size, int(rng.integers(0, 10_000)), int(rng.integers(0, 2 ** 40))]))
+    return values, target
+
+
+def _check(values: np.ndarray, target: int, out: np.ndarray) -> None:
+    assert out.dtype == np.int64
+    assert out.shape == values.shape
+    assert int(out.sum()) == target
+    assert (out >= 0).all()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_series_sum_exact_and_non_negative(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(200):
+        values, target = _random_case(rng)
+        _check(values, target, _round_series_preserve_total(values, target))
+
+
+@pytest.mark.parametrize(
+    "values, target",
+    [
+        (np.zeros(1), 0),
+        (np.zeros(1), 7),
+        (np.zeros(5), 3),
+        (np.array([2.5]), 9),
+        (np.array([1.0, 1.0, 1.0]), 2),
+        (np.array([1.0, 1.0, 1.0, 1.0]), 2 ** 53 - 1),
+        (np.array([1e-300, 1e300, 1.0]), 10 ** 15),
+        (np.array([0.1] * 10), 10 ** 12 + 3),
+    ],
+)
+def test_series_edge_cases(values, target):
+    _check(values, target, _round_series_preserve_total(values, target))
+
+
+def test_series_ties_go_to_lower_index():
+    out = _round_series_preserve_total(np.array([1.0, 1.0, 1.0]), 2)
+    assert out.tolist() == [1, 1, 0]
+
+
+def test_series_negative_target_and_values_are_clamped():
+    assert _round_series_preserve_total(np.array([1.0, 2.0]), -5).tolist() == [0, 0]
+    out = _round_series_preserve_total(np.array([-3.0, 1.0, 1.0]), 4)
+    _check(np.zeros(3), 4, out)
+    assert out[0] == 0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_segments_match_per_segment_calls(seed):
+    rng = np.random.default_rng(1000 + seed)
+    cases = [_random_case(rng) for _ in range(int(rng.integers(1, 60)))]
+    values = np.concatenate([v for v, _ in cases])
+    offsets = np.concatenate(([0], np.cumsum([v.size for v, _ in cases]))).astype(np.int64)
+    targets = np.array([t for _, t in cases], dtype=np.int64)
+
+    out = _round_segments_preserve_total(values, offsets, targets)
+    assert out.shape == values.shape
+    for k, (v, t) in enumerate(cases):
+        seg = out[offsets[k]:offsets[k + 1]]
+        _check(v, t, seg)
+        np.testing.assert_array_equal(seg, _round_series_preserve_total(v, t))
+
+
+def test_segments_with_empty_segments():
+    # empty segments (bars without a ladder) carry no values; their neighbours are unaffected
+    values = np.array([1.0, 3.0, 0.0, 0.0, 5.0])
+    offsets = np.array([0, 0, 2, 2, 4, 5, 5])
+    targets = np.array([0, 7, 0, 3, 2, 0])
+    out = _round_segments_preserve_total(values, offsets, targets)
+    for k in range(targets.size):
+        a, b = offsets[k], offsets[k + 1]
+        if a < b:
+            np.testing.assert_array_equal(out[a:b], _round_series_preserve_total(values[a:b], int(targets[k])))
+    assert out.sum() == 7 + 3 + 2
+
+
+def test_segments_empty_input():
+    out = _round_segments_preserve_total(np.empty(0), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64))
+    assert out.size == 0
+
+
+def _overshoot_cases(rng: np.random.Generator, count: int):
+    """Targets near 2**53 make the scaled quotas lose their fractional bits, so the floors can overshoot."""
+    cases = []
+    while len(cases) < count:
+        values = rng.exponential(50.0, int(rng.integers(2, 12)))
+        target = int(rng.integers(2 ** 50, 2 ** 53))
+        quota = values * (target / float(np.cumsum(values)[-1]))
+        if int(np.floor(quota).astype(np.int64).sum()) > target:
+            cases.append((values, target))
+    return cases
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_segments_overshoot_matches_per_segment_calls(seed):
+    rng = np.random.default_rng(2000 + seed)
+    cases = _overshoot_cases(rng, 8) + [_random_case(rng) for _ in range(8)]
+    order = rng.permutation(len(cases))
+    cases = [cases[i] for i in order]
+    values = np.concatenate([v for v, _ in cases])
+    offsets = np.concatenate(([0], np.cumsum([v.size for v, _ in cases]))).astype(np.int64)
+    targets = np.array([t for _, t in cases], dtype=np.int64)
+
+    out = _round_segments_preserve_total(values, offsets, targets)
+    for k, (v, t) in enumerate(cases):
+        seg = out[offsets[k]:offsets[k + 1]]
+        _check(v, t, seg)
+        np.testing.assert_array_equal(seg, _round_series_preserve_total(v, t))
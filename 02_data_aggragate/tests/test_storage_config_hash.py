@@ -0,0 +1,42 @@
+import pandas as pd
+
+from footprint_aggregator import build_v_footprints
+from footprint_storage import append_days, detect_missing_dates, list_day_fragments, read_metadata
+from test_build_v_footprints import _second_df
+
+SYMBOL = "ES"
+YEAR = 2024
+
+
+def _day_batch(day: str, seed: int):
+    df = _second_df(seed=seed)
+    df.index = pd.date_range(f"{day} 09:30:00", periods=len(df), freq="s", name="time")
+    return build_v_footprints(df, 50, 0.25, output="batch")
+
+
+def test_fragment_hashes_survive_year_write(tmp_path):
+    root = str(tmp_path)
+    # days 4-5 land as day fragments under config "a"
+    append_days(SYMBOL, 50, YEAR, [_day_batch("2024-03-04", 1), _day_batch("2024-03-05", 2)], 0.25,
+                data_root=root, layout="day", config_hash="a")
+    # day 6 goes to the year file under config "b"; the fragments stay on disk
+    append_days(SYMBOL, 50, YEAR, [_day_batch("2024-03-06", 3)], 0.25, data_root=root, layout="year", config_hash="b")
+
+    assert sorted(list_day_fragments(SYMBOL, YEAR, root)) == [20240304, 20240305]
+    meta = read_metadata(SYMBOL, YEAR, root)
+    assert meta["dates_present"] == [20240304, 20240305, 20240306]
+    assert meta["config_hash_by_date"] == {"20240304": "a", "20240305": "a", "20240306": "b"}
+
+    targets = [20240304, 20240305, 20240306]
+    assert detect_missing_dates(SYMBOL, YEAR, targets, False, root, config_hash="a") == {20240306}
+    assert detect_missing_dates(SYMBOL, YEAR, targets, False, root, config_hash="b") == {20240304, 20240305}
+
+
+def test_year_write_overrides_fragment_hash(tmp_path):
+    root = str(tmp_path)
+    append_days(SYMBOL, 50, YEAR, [_day_batch("2024-03-04", 1)], 0.25, data_root=root, layout="day", config_hash="a")
+    append_days(SYMBOL, 50, YEAR, [_day_batch("2024-03-04", 1)], 0.25, data_root=root, layout="year",
+                force_recompute_dates=[20240304], config_hash="b")
+
+    assert list_day_fragments(SYMBOL, YEAR, root) == {}
+    assert read_metadata(SYMBOL, YEAR, root)["config_hash_by_date"] == {"20240304": "b"}
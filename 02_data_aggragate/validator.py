@@ -6,7 +6,7 @@ from typing import List, Dict, Optional
 from itertools import groupby
 
 # 假设 footprint_storage.py 在同一目录或PYTHONPATH中
-from footprint_storage import read_range_as_footprint_bars # <--- 修改为新的函数
+from footprint_storage import read_range_as_footprint_bars, get_store_root # <--- 修改为新的函数
 from footprint_bar import FootprintBar # <--- 补上缺失的导入
 import os
 
@@ -15,10 +15,14 @@ def validate_daily_open(
     symbol: Symbol,
     start_date: date,
     end_date: date,
-    data_root: str = "/LeanCLI/footprint_data"
+    data_root: str = "/LeanCLI/footprint_data",
+    v_unit: Optional[int] = None,
+    allocation_config: Optional[Dict] = None,
 ) -> List[dict]:
     """
     使用高效的批量读取方式，将每日首个 footprint bar 的开盘价与分钟历史数据进行校验。
+    数据由 run(..., namespaced=True) 构建时传入相同的 v_unit / allocation_config，从对应命名空间读取；
+    默认（v_unit=None）读取 data_root 本身。
     """
     try:
         tick_size = qb.Securities[symbol].SymbolProperties.MinimumPriceVariation
@@ -47,7 +51,7 @@ def validate_daily_open(
             symbol=symbol,
             start_date=start_date,
             end_date=end_date,
-            data_root=data_root,
+            data_root=get_store_root(data_root, v_unit, allocation_config),
             tick_size=tick_size
         )
     except Exception as e: